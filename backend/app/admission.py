@@ -0,0 +1,167 @@
+import json
+import math
+import time
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+from jose import JWTError
+
+from . import config, security
+
+
+class TokenBuckets:
+    """
+    Token buckets keyed by client (IP or user id), refilled lazily on access.
+    Only touched from the event loop, so no locking is needed.
+    """
+
+    def __init__(self, rate: float, burst: float, sweep_interval: float = 60.0):
+        self.rate = rate
+        self.burst = burst
+        self.sweep_interval = sweep_interval
+        self._buckets: Dict[str, List[float]] = {}  # key -> [tokens, last refill]
+        self._last_sweep = time.monotonic()
+
+    def take(self, key: str, now: float) -> float:
+        """Consume one token. Returns 0 when allowed, else seconds until one is available."""
+        if now - self._last_sweep > self.sweep_interval:
+            self._sweep(now)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._buckets[key] = [self.burst - 1, now]
+            return 0.0
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return 0.0
+        bucket[0] = tokens
+        return (1 - tokens) / self.rate if self.rate > 0 else self.sweep_interval
+
+    def _sweep(self, now: float):
+        # Drop buckets that have refilled completely; they behave like new ones
+        self._buckets = {
+            key: bucket
+            for key, bucket in self._buckets.items()
+            if bucket[0] + (now - bucket[1]) * self.rate < self.burst
+        }
+        self._last_sweep = now
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware that rejects over-limit requests before they reach the
+    DB pool or bcrypt: 429 when a per-IP / per-user / login bucket is empty,
+    503 when an expensive route class is at its concurrency limit.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        prefix = config.API_PREFIX
+        self.login_path = f"{prefix}/auth/login"
+        self.list_path = f"{prefix}/shipments"
+        self.upload_path = f"{prefix}/uploads"
+        self.export_paths = tuple(f"{prefix}{path}" for path in config.ADMISSION_EXPORT_PATHS)
+        self.exempt_paths = (f"{prefix}/stream/",)
+
+        self.ip_buckets = TokenBuckets(config.RATE_LIMIT_IP_PER_SECOND, config.RATE_LIMIT_IP_BURST)
+        self.user_buckets = TokenBuckets(config.RATE_LIMIT_USER_PER_SECOND, config.RATE_LIMIT_USER_BURST)
+        self.login_buckets = TokenBuckets(config.RATE_LIMIT_LOGIN_PER_MINUTE / 60.0, config.RATE_LIMIT_LOGIN_BURST)
+        self.concurrency_limits = {
+            "login": config.CONCURRENCY_LIMIT_LOGIN,
+            "large_list": config.CONCURRENCY_LIMIT_LARGE_LIST,
+            "upload": config.CONCURRENCY_LIMIT_UPLOAD,
+            "export": config.CONCURRENCY_LIMIT_EXPORT,
+        }
+        self.active = {name: 0 for name in self.concurrency_limits}
+        self._token_users: Dict[str, Optional[str]] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not config.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        path = scope["path"]
+        if method == "OPTIONS" or not path.startswith(config.API_PREFIX) or path.startswith(self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+
+        now = time.monotonic()
+        client = scope.get("client")
+        ip = client[0] if client else "unknown"
+
+        wait = self.ip_buckets.take(ip, now)
+        if not wait:
+            user = self._user_key(scope)
+            if user:
+                wait = self.user_buckets.take(user, now)
+        route_class = self._classify(method, path, scope.get("query_string", b""))
+        if not wait and route_class == "login":
+            wait = self.login_buckets.take(ip, now)
+        if wait:
+            await _reject(send, 429, "Too many requests", wait)
+            return
+
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+        if self.active[route_class] >= self.concurrency_limits[route_class]:
+            await _reject(send, 503, "Server busy, please retry", config.ADMISSION_RETRY_AFTER_SECONDS)
+            return
+        self.active[route_class] += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.active[route_class] -= 1
+
+    def _classify(self, method: str, path: str, query_string: bytes) -> Optional[str]:
+        trimmed = path.rstrip("/")
+        if method == "POST" and trimmed == self.login_path:
+            return "login"
+        if method == "POST" and trimmed == self.upload_path:
+            return "upload"
+        if path.startswith(self.export_paths):
+            return "export"
+        if method == "GET" and trimmed == self.list_path and query_string:
+            limit = parse_qs(query_string.decode("latin-1")).get("limit")
+            try:
+                if limit and int(limit[0]) > config.ADMISSION_LARGE_LIST_LIMIT:
+                    return "large_list"
+            except ValueError:
+                return None
+        return None
+
+    def _user_key(self, scope) -> Optional[str]:
+        token = None
+        for name, value in scope.get("headers", ()):
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() != "bearer":
+                    token = None
+                break
+        if not token:
+            return None
+        if token in self._token_users:
+            return self._token_users[token]
+        try:
+            user = f"user:{security.decode_access_token(token).get('sub')}"
+        except JWTError:
+            user = None
+        if len(self._token_users) >= 10000:
+            self._token_users.clear()
+        self._token_users[token] = user
+        return user
+
+
+async def _reject(send, status_code: int, detail: str, retry_after: float):
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode("latin-1")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,74 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from . import config, crud
+from .database import SessionLocal
+from .periodic import PeriodicTask
+from .realtime import SSEManager, serialize_shipment, shipments_manager
+from .subscriptions import FILTER_FIELDS
+
+OVERDUE = "overdue"
+ETA_SOON = "eta_soon"
+CLEARED = "cleared"
+
+
+class ShipmentAlertScheduler(PeriodicTask):
+    """
+    Periodically finds active shipments that are overdue or due soon with
+    one indexed range query, keeps the current set, and broadcasts only the
+    changes on the "alerts" channel.
+    """
+
+    description = "Shipment alert check"
+
+    def __init__(self, manager: SSEManager, interval_seconds: float, eta_soon_days: int):
+        super().__init__(interval_seconds)
+        self.manager = manager
+        self.eta_soon_days = eta_soon_days
+        # shipment_id -> (kind, serialized shipment)
+        self.current: Dict[str, Tuple[str, dict]] = {}
+        self.checked_at: Optional[datetime] = None
+
+    def _load(self, today: date):
+        db = SessionLocal()
+        try:
+            due = crud.get_due_shipments(db, today + timedelta(days=self.eta_soon_days))
+            return [
+                (OVERDUE if shipment.delivery_date < today else ETA_SOON, serialize_shipment(shipment))
+                for shipment in due
+            ]
+        finally:
+            db.close()
+
+    async def run_once(self, today: Optional[date] = None):
+        rows = await run_in_threadpool(self._load, today or date.today())
+        latest = {payload["id"]: (kind, payload) for kind, payload in rows}
+
+        for shipment_id, (kind, payload) in latest.items():
+            previous = self.current.get(shipment_id)
+            if previous is None or previous[0] != kind:
+                await self.manager.broadcast({"channel": "alerts", "event": kind, "payload": payload})
+        for shipment_id, (kind, payload) in self.current.items():
+            if shipment_id not in latest:
+                # Last known filter fields, so only subscribers that saw the alert get the clear
+                cleared = {field: payload.get(field) for field in FILTER_FIELDS}
+                cleared.update(id=shipment_id, previous=kind)
+                await self.manager.broadcast({"channel": "alerts", "event": CLEARED, "payload": cleared})
+
+        self.current = latest
+        self.checked_at = datetime.utcnow()
+
+    def snapshot(self) -> Dict[str, list]:
+        result = {OVERDUE: [], ETA_SOON: []}
+        for kind, payload in self.current.values():
+            result[kind].append(payload)
+        return result
+
+
+shipment_alerts = ShipmentAlertScheduler(
+    shipments_manager,
+    interval_seconds=config.ALERT_INTERVAL_SECONDS,
+    eta_soon_days=config.ALERT_ETA_SOON_DAYS,
+)
@@ -4,11 +4,68 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def _env_flag(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).strip().lower() in {"1", "true", "yes", "on"}
+
+
 SECRET_KEY = os.getenv("SECRET_KEY", "change-me-freight-secret")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "120"))
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
 API_PREFIX = os.getenv("API_PREFIX", "/api")
+EXPORT_MAX_ROWS = int(os.getenv("EXPORT_MAX_ROWS", "50000"))
+# Pending events per WebSocket client before it is disconnected as too slow
+WS_QUEUE_MAX = int(os.getenv("WS_QUEUE_MAX", "1000"))
+
+# Database pool / startup
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+# Set when schema setup (create_all, indexes, finance backfill) already ran
+# elsewhere; `python -m app.main` runs it once and sets this for its workers.
+# Plain `uvicorn app.main:app --workers N` runs it in every worker unless this
+# is set, so run `python -m app.main --schema-only` first and start uvicorn
+# with SKIP_SCHEMA_CHECK=1.
+SKIP_SCHEMA_CHECK = _env_flag("SKIP_SCHEMA_CHECK")
+
+# Batch document (delivery order / invoice) rendering
+DOCUMENT_CACHE_DIR = os.getenv("DOCUMENT_CACHE_DIR", "document_cache")
+# Render processes per API worker; 0 = CPU cores split across the API workers
+DOCUMENT_WORKERS = int(os.getenv("DOCUMENT_WORKERS", "0"))
+# uvicorn's own worker-count variable (`uvicorn --workers` defaults to it);
+# `python -m app.main --workers N` sets it
+API_WORKERS = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+DOCUMENT_BATCH_MAX = int(os.getenv("DOCUMENT_BATCH_MAX", "5000"))
+DOCUMENT_COMPANY_NAME = os.getenv("DOCUMENT_COMPANY_NAME", "TNT Freight")
+
+# How often each worker pulls other workers' shipment changes into its fleet index
+FLEET_REFRESH_SECONDS = float(os.getenv("FLEET_REFRESH_SECONDS", "5"))
+
+# Overdue / ETA-soon alert scheduler
+ALERT_SCHEDULER_ENABLED = _env_flag("ALERT_SCHEDULER_ENABLED", "true")
+ALERT_INTERVAL_SECONDS = float(os.getenv("ALERT_INTERVAL_SECONDS", "60"))
+# Active shipments due within this many days (today included) are "ETA soon"
+ALERT_ETA_SOON_DAYS = int(os.getenv("ALERT_ETA_SOON_DAYS", "1"))
+
+# Admission control / rate limiting
+RATE_LIMIT_ENABLED = _env_flag("RATE_LIMIT_ENABLED", "true")
+RATE_LIMIT_IP_PER_SECOND = float(os.getenv("RATE_LIMIT_IP_PER_SECOND", "20"))
+RATE_LIMIT_IP_BURST = float(os.getenv("RATE_LIMIT_IP_BURST", "60"))
+RATE_LIMIT_USER_PER_SECOND = float(os.getenv("RATE_LIMIT_USER_PER_SECOND", "10"))
+RATE_LIMIT_USER_BURST = float(os.getenv("RATE_LIMIT_USER_BURST", "40"))
+RATE_LIMIT_LOGIN_PER_MINUTE = float(os.getenv("RATE_LIMIT_LOGIN_PER_MINUTE", "10"))
+RATE_LIMIT_LOGIN_BURST = float(os.getenv("RATE_LIMIT_LOGIN_BURST", "5"))
+CONCURRENCY_LIMIT_LOGIN = int(os.getenv("CONCURRENCY_LIMIT_LOGIN", "4"))
+CONCURRENCY_LIMIT_LARGE_LIST = int(os.getenv("CONCURRENCY_LIMIT_LARGE_LIST", "8"))
+CONCURRENCY_LIMIT_UPLOAD = int(os.getenv("CONCURRENCY_LIMIT_UPLOAD", "4"))
+CONCURRENCY_LIMIT_EXPORT = int(os.getenv("CONCURRENCY_LIMIT_EXPORT", "2"))
+# GET /shipments/ with a larger `limit` than this counts as a large list query
+ADMISSION_LARGE_LIST_LIMIT = int(os.getenv("ADMISSION_LARGE_LIST_LIMIT", "200"))
+ADMISSION_EXPORT_PATHS = tuple(
+    path.strip() for path in os.getenv("ADMISSION_EXPORT_PATHS", "/shipments/export,/shipments/documents").split(",") if path.strip()
+)
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
 
 
 def access_token_expiry_delta() -> timedelta:
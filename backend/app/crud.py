@@ -1,11 +1,80 @@
 from datetime import datetime
+from decimal import Decimal
 import uuid
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from . import models, schemas, security
 
 # --- Shipment Logic ---
 
+class FleetConflictError(Exception):
+    """A lorry or driver is already booked for overlapping dates."""
+
+    def __init__(self, conflicts):
+        super().__init__("Lorry or driver is already booked for these dates")
+        self.conflicts = conflicts
+
+def clean_fleet_name(value):
+    """Lorry numbers and driver names are stored with whitespace collapsed."""
+    if value is None:
+        return None
+    return " ".join(value.split()) or None
+
+def fleet_key(value):
+    """Identity of a lorry or driver: collapsed whitespace, lowercased (matches SQL lower())."""
+    value = clean_fleet_name(value)
+    return value.lower() if value else None
+
+def _fleet_booking(shipment):
+    """Everything the double-booking check depends on."""
+    return (
+        fleet_key(shipment.lorry_no),
+        fleet_key(shipment.driver_name),
+        shipment.pickup_date,
+        shipment.delivery_date,
+        (shipment.status or models.ShipmentStatusEnum.New) != models.ShipmentStatusEnum.Cancelled,
+    )
+
+def find_fleet_conflicts(db: Session, shipment, exclude_id: str = None):
+    """
+    Authoritative double-booking check against the DB, run inside the write
+    transaction. `shipment` is anything with the shipment's booking fields.
+    Date windows are inclusive; cancelled and deleted shipments never conflict.
+    """
+    if (shipment.status or models.ShipmentStatusEnum.New) == models.ShipmentStatusEnum.Cancelled:
+        return []
+    start, end = sorted((shipment.pickup_date, shipment.delivery_date))
+    Shipment = models.Shipment
+    conflicts = []
+    for resource in ("lorry_no", "driver_name"):
+        key = fleet_key(getattr(shipment, resource))
+        if not key:
+            continue
+        column = getattr(Shipment, resource)
+        # (lower(resource), delivery_date) index: only bookings ending on/after `start` are scanned
+        query = db.query(Shipment.id, column, Shipment.pickup_date, Shipment.delivery_date).filter(
+            func.lower(column) == key,
+            Shipment.delivery_date >= start,
+            Shipment.pickup_date <= end,
+            Shipment.deleted_at.is_(None),
+            Shipment.status != models.ShipmentStatusEnum.Cancelled,
+        )
+        if exclude_id:
+            query = query.filter(Shipment.id != exclude_id)
+        for shipment_id, booked_value, pickup_date, delivery_date in query.all():
+            conflicts.append({
+                "resource": resource,
+                "value": booked_value,
+                "shipment_id": shipment_id,
+                "pickup_date": pickup_date.isoformat(),
+                "delivery_date": delivery_date.isoformat(),
+            })
+    return conflicts
+
 def generate_booking_reference(db: Session):
     """
     Generates a running number like SHP-2025-0001
@@ -18,7 +87,12 @@ def generate_booking_reference(db: Session):
     
     return f"{prefix}-{str(count + 1).zfill(4)}"
 
-def create_shipment(db: Session, shipment: schemas.ShipmentCreate, user_id: int):
+def create_shipment(db: Session, shipment: schemas.ShipmentCreate, user_id: int, force: bool = False):
+    if not force:
+        conflicts = find_fleet_conflicts(db, shipment)
+        if conflicts:
+            raise FleetConflictError(conflicts)
+
     attempts = 0
     while attempts < 3:
         new_ref = generate_booking_reference(db)
@@ -40,9 +114,9 @@ def create_shipment(db: Session, shipment: schemas.ShipmentCreate, user_id: int)
             cost_amount=shipment.cost_amount,
             driver_commission=shipment.driver_commission,
             
-            lorry_no=shipment.lorry_no,
+            lorry_no=clean_fleet_name(shipment.lorry_no),
             lorry_company=shipment.lorry_company,
-            driver_name=shipment.driver_name,
+            driver_name=clean_fleet_name(shipment.driver_name),
             
             delivery_order_no=shipment.delivery_order_no,
             company_invoice_no=shipment.company_invoice_no,
@@ -57,6 +131,8 @@ def create_shipment(db: Session, shipment: schemas.ShipmentCreate, user_id: int)
 
         db.add(db_shipment)
         try:
+            db.flush()
+            _apply_finance_change(db, None, _finance_snapshot(db_shipment))
             db.commit()
             db.refresh(db_shipment)
             return db_shipment
@@ -84,7 +160,20 @@ def get_shipment_by_id(db: Session, shipment_id: str):
         .first()
     )
 
-def update_shipment_status(db: Session, shipment_id: str, update_data: schemas.ShipmentUpdate, user_id: int):
+def get_shipments_by_ids(db: Session, shipment_ids, chunk_size: int = 1000):
+    shipments = []
+    for start in range(0, len(shipment_ids), chunk_size):
+        chunk = shipment_ids[start:start + chunk_size]
+        shipments.extend(
+            db.query(models.Shipment)
+            .filter(models.Shipment.id.in_(chunk), models.Shipment.deleted_at.is_(None))
+            .all()
+        )
+    return shipments
+
+def update_shipment_status(
+    db: Session, shipment_id: str, update_data: schemas.ShipmentUpdate, user_id: int, force: bool = False
+):
     db_shipment = (
         db.query(models.Shipment)
         .filter(models.Shipment.id == shipment_id, models.Shipment.deleted_at.is_(None))
@@ -94,12 +183,31 @@ def update_shipment_status(db: Session, shipment_id: str, update_data: schemas.S
     if not db_shipment:
         return None
     
+    before = _finance_snapshot(db_shipment)
+    booking_before = _fleet_booking(db_shipment)
+
     # Update all fields provided in payload
     update_dict = update_data.model_dump(exclude_unset=True)
+    for key in ("lorry_no", "driver_name"):
+        if key in update_dict:
+            update_dict[key] = clean_fleet_name(update_dict[key])
     for key, value in update_dict.items():
         setattr(db_shipment, key, value)
     
     db_shipment.updated_by_user_id = user_id
+
+    # Forms resend every field: only re-check when the lorry, driver, dates or
+    # Cancelled-ness actually changed, so status edits on a forced booking pass
+    booking_after = _fleet_booking(db_shipment)
+    if not force and booking_after != booking_before:
+        conflicts = find_fleet_conflicts(db, db_shipment, exclude_id=shipment_id)
+        if conflicts:
+            db.rollback()
+            raise FleetConflictError(conflicts)
+
+    after = _finance_snapshot(db_shipment)
+    if before != after:
+        _apply_finance_change(db, before, after)
     
     db.commit()
     db.refresh(db_shipment)
@@ -113,11 +221,300 @@ def delete_shipment(db: Session, shipment_id: str) -> bool:
     )
     if not db_shipment:
         return False
+    _apply_finance_change(db, _finance_snapshot(db_shipment), None)
     db_shipment.deleted_at = datetime.utcnow()
     db.add(db_shipment)
     db.commit()
     return True
 
+def get_fleet_bookings(db: Session):
+    """(id, lorry_no, driver_name, pickup_date, delivery_date) of every shipment that books a lorry or driver."""
+    Shipment = models.Shipment
+    return (
+        db.query(Shipment.id, Shipment.lorry_no, Shipment.driver_name, Shipment.pickup_date, Shipment.delivery_date)
+        .filter(
+            Shipment.deleted_at.is_(None),
+            Shipment.status != models.ShipmentStatusEnum.Cancelled,
+            (Shipment.lorry_no.isnot(None)) | (Shipment.driver_name.isnot(None)),
+        )
+        .all()
+    )
+
+def clean_fleet_names(db: Session) -> int:
+    """
+    Collapse whitespace in lorry numbers and driver names written before
+    they were cleaned on write, so the DB check and the fleet index agree.
+    """
+    Shipment = models.Shipment
+    untidy = [
+        column.like(pattern)
+        for column in (Shipment.lorry_no, Shipment.driver_name)
+        for pattern in ("%  %", " %", "% ")
+    ]
+    cleaned = 0
+    for shipment in db.query(Shipment).filter(or_(*untidy)).all():
+        shipment.lorry_no = clean_fleet_name(shipment.lorry_no)
+        shipment.driver_name = clean_fleet_name(shipment.driver_name)
+        cleaned += 1
+    db.commit()
+    return cleaned
+
+ACTIVE_SHIPMENT_STATUSES = (
+    models.ShipmentStatusEnum.New,
+    models.ShipmentStatusEnum.Assigned,
+    models.ShipmentStatusEnum.PickedUp,
+)
+
+def get_latest_shipment_update(db: Session):
+    return db.query(func.max(models.Shipment.updated_at)).scalar()
+
+def get_fleet_changes(db: Session, since):
+    """Booking fields of every shipment touched at or after `since` (deleted and cancelled included)."""
+    Shipment = models.Shipment
+    return (
+        db.query(
+            Shipment.id, Shipment.lorry_no, Shipment.driver_name, Shipment.pickup_date,
+            Shipment.delivery_date, Shipment.status, Shipment.deleted_at, Shipment.updated_at,
+        )
+        .filter(Shipment.updated_at >= since)
+        .all()
+    )
+
+def get_due_shipments(db: Session, due_on_or_before):
+    """Active shipments due on or before a date; served by ix_shipments_status_delivery_date."""
+    return (
+        db.query(models.Shipment)
+        .filter(
+            models.Shipment.status.in_(ACTIVE_SHIPMENT_STATUSES),
+            models.Shipment.delivery_date <= due_on_or_before,
+            models.Shipment.deleted_at.is_(None),
+        )
+        .order_by(models.Shipment.delivery_date)
+        .all()
+    )
+
+# --- Finance Rollup ---
+
+_ZERO = Decimal("0.00")
+
+
+def _finance_snapshot(shipment: models.Shipment):
+    """
+    Rollup key and amounts a shipment contributes, or None when it should not
+    be counted (cancelled or soft-deleted).
+    """
+    if shipment.deleted_at is not None or shipment.status == models.ShipmentStatusEnum.Cancelled:
+        return None
+    key = (
+        shipment.delivery_date,
+        shipment.customer_name,
+        models.ShipmentTypeEnum(shipment.shipment_type),
+        shipment.lorry_company or "",
+    )
+    amounts = (
+        Decimal(shipment.revenue_amount or _ZERO),
+        Decimal(shipment.cost_amount or _ZERO),
+        Decimal(shipment.driver_commission or _ZERO),
+    )
+    return key, amounts
+
+
+def _apply_finance_change(db: Session, before, after):
+    """
+    Move a shipment's contribution in the rollup from `before` to `after`
+    (either may be None), inside the caller's transaction.
+    """
+    deltas = {}
+    for snapshot, sign in ((before, -1), (after, 1)):
+        if snapshot is None:
+            continue
+        key, amounts = snapshot
+        current = deltas.get(key, (_ZERO, _ZERO, _ZERO, 0))
+        deltas[key] = (
+            current[0] + sign * amounts[0],
+            current[1] + sign * amounts[1],
+            current[2] + sign * amounts[2],
+            current[3] + sign,
+        )
+
+    rollup = models.ShipmentFinanceDaily.__table__
+    # Fixed key order keeps concurrent writers from locking rows in opposite orders
+    for key in sorted(deltas, key=_finance_key_order):
+        revenue, cost, commission, count = deltas[key]
+        if not count and not any((revenue, cost, commission)):
+            continue
+        day, customer_name, shipment_type, lorry_company = key
+        db.execute(_finance_upsert(db, {
+            "day": day,
+            "customer_name": customer_name,
+            "shipment_type": shipment_type,
+            "lorry_company": lorry_company,
+            "revenue_total": revenue,
+            "cost_total": cost,
+            "driver_commission_total": commission,
+            "shipment_count": count,
+        }))
+        if count < 0:
+            db.execute(
+                rollup.delete().where(
+                    rollup.c.day == day,
+                    rollup.c.customer_name == customer_name,
+                    rollup.c.shipment_type == shipment_type,
+                    rollup.c.lorry_company == lorry_company,
+                    rollup.c.shipment_count <= 0,
+                )
+            )
+
+
+FINANCE_UPSERT_DIALECTS = ("mysql", "postgresql", "sqlite")
+
+
+def check_finance_rollup_dialect(dialect: str):
+    """Fail at startup, not on the first shipment write, when the rollup upsert is unavailable."""
+    if dialect not in FINANCE_UPSERT_DIALECTS:
+        raise RuntimeError(
+            f"Finance rollup needs an upsert-capable database ({', '.join(FINANCE_UPSERT_DIALECTS)}), got {dialect}"
+        )
+
+
+def _finance_key_order(key):
+    return key[0], key[1], str(key[2]), key[3]
+
+
+def _finance_upsert(db: Session, values: dict, replace: bool = False):
+    """
+    Single-statement "insert or add to" on the rollup's primary key, so
+    concurrent writers never race between a read and an insert. With
+    replace=True existing totals are overwritten instead (rebuilds).
+    """
+    rollup = models.ShipmentFinanceDaily.__table__
+    summed = ("revenue_total", "cost_total", "driver_commission_total", "shipment_count")
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        stmt = mysql_insert(rollup).values(**values)
+        return stmt.on_duplicate_key_update({
+            column: stmt.inserted[column] if replace else rollup.c[column] + stmt.inserted[column]
+            for column in summed
+        })
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+        stmt = insert(rollup).values(**values)
+        return stmt.on_conflict_do_update(
+            index_elements=[column.name for column in rollup.primary_key.columns],
+            set_={
+                column: stmt.excluded[column] if replace else rollup.c[column] + stmt.excluded[column]
+                for column in summed
+            },
+        )
+    raise NotImplementedError(f"Finance rollup upsert is not supported on {dialect}")
+
+
+def rebuild_finance_rollup(db: Session) -> int:
+    """
+    Recompute the whole rollup from shipments. Used to backfill an empty
+    table; every row is written with a replacing upsert, so workers booting
+    at the same time produce the same rows instead of key collisions.
+    """
+    Shipment = models.Shipment
+    lorry_company = func.coalesce(Shipment.lorry_company, "")
+    grouped = (
+        db.query(
+            Shipment.delivery_date,
+            Shipment.customer_name,
+            Shipment.shipment_type,
+            lorry_company,
+            func.sum(Shipment.revenue_amount),
+            func.sum(func.coalesce(Shipment.cost_amount, 0)),
+            func.sum(func.coalesce(Shipment.driver_commission, 0)),
+            func.count(Shipment.id),
+        )
+        .filter(
+            Shipment.deleted_at.is_(None),
+            Shipment.status != models.ShipmentStatusEnum.Cancelled,
+        )
+        .group_by(Shipment.delivery_date, Shipment.customer_name, Shipment.shipment_type, lorry_company)
+        .all()
+    )
+    totals = {
+        (day, customer_name, models.ShipmentTypeEnum(shipment_type), company): (revenue, cost, commission, count)
+        for day, customer_name, shipment_type, company, revenue, cost, commission, count in grouped
+    }
+    for key in sorted(totals, key=_finance_key_order):
+        revenue, cost, commission, count = totals[key]
+        day, customer_name, shipment_type, company = key
+        db.execute(_finance_upsert(db, {
+            "day": day,
+            "customer_name": customer_name,
+            "shipment_type": shipment_type,
+            "lorry_company": company,
+            "revenue_total": revenue or _ZERO,
+            "cost_total": cost or _ZERO,
+            "driver_commission_total": commission or _ZERO,
+            "shipment_count": count,
+        }, replace=True))
+
+    rollup = models.ShipmentFinanceDaily.__table__
+    existing = db.execute(
+        select(rollup.c.day, rollup.c.customer_name, rollup.c.shipment_type, rollup.c.lorry_company)
+    ).all()
+    for day, customer_name, shipment_type, company in existing:
+        if (day, customer_name, models.ShipmentTypeEnum(shipment_type), company) not in totals:
+            db.execute(rollup.delete().where(
+                rollup.c.day == day,
+                rollup.c.customer_name == customer_name,
+                rollup.c.shipment_type == shipment_type,
+                rollup.c.lorry_company == company,
+            ))
+    db.commit()
+    return len(totals)
+
+
+def finance_rollup_is_empty(db: Session) -> bool:
+    return db.query(models.ShipmentFinanceDaily.day).first() is None
+
+
+FINANCE_GROUP_COLUMNS = {
+    "customer": models.ShipmentFinanceDaily.customer_name,
+    "shipment_type": models.ShipmentFinanceDaily.shipment_type,
+    "lorry_company": models.ShipmentFinanceDaily.lorry_company,
+}
+
+
+def get_finance_report(db: Session, group_by, date_from=None, date_to=None):
+    """
+    Aggregate the daily rollup. group_by is a list drawn from
+    day / month / customer / shipment_type / lorry_company.
+    """
+    Rollup = models.ShipmentFinanceDaily
+    group_columns = []
+    labels = []
+    for dimension in group_by:
+        if dimension == "day":
+            group_columns.append(Rollup.day.label("day"))
+            labels.append("day")
+        elif dimension == "month":
+            group_columns.append(func.extract("year", Rollup.day).label("year"))
+            group_columns.append(func.extract("month", Rollup.day).label("month"))
+            labels.extend(["year", "month"])
+        else:
+            group_columns.append(FINANCE_GROUP_COLUMNS[dimension].label(dimension))
+            labels.append(dimension)
+
+    query = db.query(
+        *group_columns,
+        func.sum(Rollup.revenue_total).label("revenue"),
+        func.sum(Rollup.cost_total).label("cost"),
+        func.sum(Rollup.driver_commission_total).label("driver_commission"),
+        func.sum(Rollup.shipment_count).label("shipment_count"),
+    )
+    if date_from:
+        query = query.filter(Rollup.day >= date_from)
+    if date_to:
+        query = query.filter(Rollup.day <= date_to)
+    if group_columns:
+        query = query.group_by(*group_columns).order_by(*group_columns)
+    return labels, query.all()
+
 # --- User Logic (Keep as is) ---
 def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
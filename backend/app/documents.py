@@ -0,0 +1,281 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import textwrap
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+DELIVERY_ORDER = "delivery_order"
+INVOICE = "invoice"
+DOCUMENT_KINDS = (DELIVERY_ORDER, INVOICE)
+
+# Bump when the layout changes so cached PDFs are re-rendered
+TEMPLATE_VERSION = "2"
+
+DOCUMENT_FIELDS = (
+    "id", "booking_reference", "customer_name", "collection_from", "deliver_to",
+    "pickup_date", "delivery_date", "shipment_type", "revenue_amount",
+    "lorry_no", "lorry_company", "driver_name",
+    "delivery_order_no", "company_invoice_no", "remarks",
+)
+
+_PAGE_WIDTH = 595  # A4 in points
+_PAGE_HEIGHT = 842
+_MARGIN = 50
+_LINE_HEIGHT = 16
+_WRAP_WIDTH = 85
+_LINES_PER_PAGE = (_PAGE_HEIGHT - 2 * _MARGIN - 40) // _LINE_HEIGHT
+_PDF_ENCODING = "cp1252"  # WinAnsiEncoding of the standard Helvetica fonts
+
+
+def shipment_fields(shipment) -> Dict[str, str]:
+    """Plain-string snapshot of what a document shows; picklable for the pool."""
+    fields = {}
+    for name in DOCUMENT_FIELDS:
+        value = getattr(shipment, name)
+        value = getattr(value, "value", value)
+        if isinstance(value, Decimal):
+            value = f"{value:,.2f}"
+        fields[name] = "" if value is None else str(value)
+    return fields
+
+
+def document_version(kind: str, fields: Dict[str, str]) -> str:
+    """Content hash of everything the document renders; changes whenever the shipment does."""
+    raw = json.dumps([TEMPLATE_VERSION, kind, config.DOCUMENT_COMPANY_NAME, fields], sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def unrenderable_fields(fields: Dict[str, str]) -> List[str]:
+    """
+    Fields with characters outside WinAnsiEncoding, which the built-in PDF
+    fonts cannot show (e.g. Chinese or Tamil names).
+    """
+    bad = []
+    for name, value in fields.items():
+        try:
+            value.encode(_PDF_ENCODING)
+        except UnicodeEncodeError:
+            bad.append(name)
+    return bad
+
+
+def document_filename(kind: str, fields: Dict[str, str]) -> str:
+    number = fields["delivery_order_no"] if kind == DELIVERY_ORDER else fields["company_invoice_no"]
+    stem = number or fields["booking_reference"] or fields["id"]
+    safe = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in stem)
+    return f"{kind}/{safe}-{fields['id'][:8]}.pdf"
+
+
+def _document_lines(kind: str, fields: Dict[str, str]) -> Tuple[str, List[Tuple[str, str]]]:
+    if kind == DELIVERY_ORDER:
+        return "DELIVERY ORDER", [
+            ("DO No", fields["delivery_order_no"] or "-"),
+            ("Booking Ref", fields["booking_reference"]),
+            ("Customer", fields["customer_name"]),
+            ("Collect From", fields["collection_from"]),
+            ("Deliver To", fields["deliver_to"]),
+            ("Pickup Date", fields["pickup_date"]),
+            ("Delivery Date", fields["delivery_date"]),
+            ("Lorry No", fields["lorry_no"] or "-"),
+            ("Lorry Company", fields["lorry_company"] or "-"),
+            ("Driver", fields["driver_name"] or "-"),
+            ("Remarks", fields["remarks"] or "-"),
+            ("", ""),
+            ("Received By", "______________________________"),
+            ("Date / Chop", "______________________________"),
+        ]
+    return "INVOICE", [
+        ("Invoice No", fields["company_invoice_no"] or "-"),
+        ("Booking Ref", fields["booking_reference"]),
+        ("DO No", fields["delivery_order_no"] or "-"),
+        ("Bill To", fields["customer_name"]),
+        ("Invoice Date", fields["delivery_date"]),
+        ("", ""),
+        ("Description", f"Freight ({fields['shipment_type']}) from {fields['collection_from']} "
+                        f"to {fields['deliver_to']}, picked up {fields['pickup_date']}"),
+        ("Lorry No", fields["lorry_no"] or "-"),
+        ("Amount", fields["revenue_amount"] or "0.00"),
+        ("Remarks", fields["remarks"] or "-"),
+    ]
+
+
+def _pdf_text(value: str) -> str:
+    # Content streams hold WinAnsi bytes; callers reject unrenderable text first
+    value = value.encode(_PDF_ENCODING, "replace").decode("latin-1")
+    return value.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _build_pdf(title: str, rows: List[Tuple[str, str]]) -> bytes:
+    """Minimal text-only PDF (Helvetica, A4); enough for DO / invoice layouts."""
+    lines: List[Tuple[str, str]] = []
+    for label, value in rows:
+        wrapped = textwrap.wrap(value, _WRAP_WIDTH) or [""]
+        lines.append((label, wrapped[0]))
+        lines.extend(("", extra) for extra in wrapped[1:])
+    pages = [lines[i:i + _LINES_PER_PAGE] for i in range(0, len(lines), _LINES_PER_PAGE)] or [[]]
+
+    objects: List[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # page tree, filled in once page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+    page_numbers = []
+    for page_index, page_lines in enumerate(pages):
+        y = _PAGE_HEIGHT - _MARGIN
+        ops = [
+            f"BT /F2 12 Tf {_MARGIN} {y} Td ({_pdf_text(config.DOCUMENT_COMPANY_NAME)}) Tj ET",
+            f"BT /F2 18 Tf {_MARGIN} {y - 26} Td ({_pdf_text(title)}) Tj ET",
+        ]
+        y -= 60
+        for label, value in page_lines:
+            if label:
+                ops.append(f"BT /F2 10 Tf {_MARGIN} {y} Td ({_pdf_text(label)}) Tj ET")
+            ops.append(f"BT /F1 10 Tf {_MARGIN + 110} {y} Td ({_pdf_text(value)}) Tj ET")
+            y -= _LINE_HEIGHT
+        ops.append(f"BT /F1 8 Tf {_PAGE_WIDTH - _MARGIN - 40} {_MARGIN - 20} Td "
+                   f"(Page {page_index + 1}/{len(pages)}) Tj ET")
+        stream = "\n".join(ops).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>"
+            % (_PAGE_WIDTH, _PAGE_HEIGHT, len(objects))
+        )
+        page_numbers.append(len(objects))
+    kids = " ".join(f"{number} 0 R" for number in page_numbers).encode("latin-1")
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_numbers))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref_at = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_at)
+    return bytes(out)
+
+
+def render_document(kind: str, fields: Dict[str, str]) -> bytes:
+    """Pure render step; runs inside the process pool."""
+    title, rows = _document_lines(kind, fields)
+    return _build_pdf(title, rows)
+
+
+class DocumentRenderer:
+    """
+    Renders documents in a process pool and keeps the PDFs on disk, shared by
+    every API worker. There is one cache file per shipment and kind whose
+    first line is the content version, so a changed shipment overwrites its
+    stale PDF instead of adding another file.
+    """
+
+    def __init__(self, cache_dir: str, max_workers: Optional[int] = None):
+        self.cache_dir = Path(cache_dir).resolve()
+        # Every API worker has its own pool, so share the cores between them
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 1) // config.API_WORKERS)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _cache_path(self, kind: str, fields: Dict[str, str]) -> Path:
+        return self.cache_dir / fields["id"][:2] / f"{fields['id']}-{kind}.pdf"
+
+    def _load(self, path: Path, version: str) -> Optional[bytes]:
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        header, _, content = data.partition(b"\n")
+        return content if header == version.encode("ascii") else None
+
+    def _store(self, path: Path, version: str, content: bytes):
+        """Atomically replace the cache file; failures only cost a re-render later."""
+        tmp = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False) as handle:
+                tmp = handle.name
+                handle.write(version.encode("ascii") + b"\n")
+                handle.write(content)
+            os.replace(tmp, path)
+        except OSError:
+            logger.warning("Could not cache document %s", path, exc_info=True)
+            if tmp is not None:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+
+    async def _render_one(self, kind: str, fields: Dict[str, str]) -> Tuple[str, bytes]:
+        name = document_filename(kind, fields)
+        path = self._cache_path(kind, fields)
+        version = document_version(kind, fields)
+        loop = asyncio.get_running_loop()
+        cached = await loop.run_in_executor(None, self._load, path, version)
+        if cached is not None:
+            return name, cached
+        content = await loop.run_in_executor(self._executor(), render_document, kind, fields)
+        await loop.run_in_executor(None, self._store, path, version, content)
+        return name, content
+
+    async def stream_zip(self, jobs: List[Tuple[str, Dict[str, str]]]) -> AsyncIterator[bytes]:
+        """Yield ZIP bytes as documents finish rendering, in completion order."""
+        buffer = _ZipBuffer()
+        tasks = [asyncio.ensure_future(self._render_one(kind, fields)) for kind, fields in jobs]
+        try:
+            with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+                for finished in asyncio.as_completed(tasks):
+                    name, content = await finished
+                    archive.writestr(name, content)
+                    chunk = buffer.drain()
+                    if chunk:
+                        yield chunk
+            yield buffer.drain()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+class _ZipBuffer:
+    """Write-only, non-seekable sink so zipfile streams entries with data descriptors."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+document_renderer = DocumentRenderer(config.DOCUMENT_CACHE_DIR, config.DOCUMENT_WORKERS or None)
@@ -0,0 +1,115 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Iterable, List, Optional
+
+import msgpack
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from . import schemas
+
+COLUMNAR_JSON = "application/vnd.freight.columnar+json"
+MSGPACK = "application/x-msgpack"
+
+SHIPMENT_COLUMNS: List[str] = list(schemas.ShipmentResponse.model_fields)
+
+# Enum columns are sent as indexes into these lists
+SHIPMENT_DICTIONARIES = {
+    "status": [item.value for item in schemas.ShipmentStatus],
+    "shipment_type": [item.value for item in schemas.ShipmentType],
+}
+
+_EPOCH_DATE = date(1970, 1, 1)
+# Datetimes go out exactly as the default JSON list renders them
+_DATETIME = TypeAdapter(datetime)
+
+
+def _column_encoding(name: str) -> str:
+    if name in SHIPMENT_DICTIONARIES:
+        return "dict"
+    annotation = schemas.ShipmentResponse.model_fields[name].annotation
+    if annotation in (date, Optional[date]):
+        return "days"
+    if annotation in (datetime, Optional[datetime]):
+        return "iso"
+    if annotation in (Decimal, Optional[Decimal]):
+        return "cents"
+    return "plain"
+
+
+SHIPMENT_ENCODINGS = {name: _column_encoding(name) for name in SHIPMENT_COLUMNS}
+
+
+def negotiate(accept: Optional[str]) -> Optional[str]:
+    """
+    Pick a compact media type from an Accept header, or None for the
+    default JSON list. Honours q-values; unknown types are ignored.
+    """
+    if not accept:
+        return None
+    offered = {COLUMNAR_JSON, MSGPACK, "application/json", "*/*", "application/*"}
+    candidates = []
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type.lower() in offered and quality > 0:
+            candidates.append((-quality, position, media_type.lower()))
+    if not candidates:
+        return None
+    best = min(candidates)[2]
+    return best if best in (COLUMNAR_JSON, MSGPACK) else None
+
+
+def _encode_value(value, encoding: str, dictionary=None):
+    if value is None:
+        return None
+    if encoding == "dict":
+        return dictionary.index(value.value if isinstance(value, Enum) else value)
+    if encoding == "days":
+        return (value - _EPOCH_DATE).days
+    if encoding == "iso":
+        return _DATETIME.dump_python(value, mode="json")
+    if encoding == "cents":
+        return int((Decimal(value) * 100).to_integral_value())
+    return value
+
+
+def encode_shipments_columnar(shipments: Iterable) -> dict:
+    """
+    Column-major payload: names once, rows as arrays. Enums are indexes into
+    `dictionaries`, dates are days since 1970-01-01, datetimes are the same
+    ISO strings as the default JSON (DB values carry no zone, so they are
+    not converted) and money is integer cents.
+    """
+    plan = [
+        (name, SHIPMENT_ENCODINGS[name], SHIPMENT_DICTIONARIES.get(name))
+        for name in SHIPMENT_COLUMNS
+    ]
+    rows = [
+        [_encode_value(getattr(shipment, name), encoding, dictionary) for name, encoding, dictionary in plan]
+        for shipment in shipments
+    ]
+    return {
+        "columns": SHIPMENT_COLUMNS,
+        "encodings": SHIPMENT_ENCODINGS,
+        "dictionaries": SHIPMENT_DICTIONARIES,
+        "rows": rows,
+    }
+
+
+def compact_shipments_response(shipments: Iterable, media_type: str) -> Response:
+    payload = encode_shipments_columnar(shipments)
+    if media_type == MSGPACK:
+        body = msgpack.packb(payload, use_bin_type=True)
+    else:
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return Response(content=body, media_type=media_type, headers={"Vary": "Accept"})
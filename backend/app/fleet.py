@@ -0,0 +1,188 @@
+from bisect import bisect_left, insort
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from . import config, crud
+from .database import SessionLocal
+from .models import ShipmentStatusEnum
+from .periodic import PeriodicTask
+
+_ONE_DAY = timedelta(days=1)
+
+
+def _as_date(value) -> date:
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class _Timeline:
+    """
+    Bookings of one lorry or driver, sorted by start date. Any booking that
+    overlaps [a, b] starts within [a - max_span, b], so a lookup is two
+    bisects plus a scan of the few bookings in that window.
+    """
+
+    def __init__(self, label: str):
+        self.label = label
+        self.entries: List[Tuple[date, str, date]] = []  # (start, shipment_id, end)
+        self.max_span = timedelta(0)
+
+    def add(self, start: date, end: date, shipment_id: str):
+        insort(self.entries, (start, shipment_id, end))
+        self.max_span = max(self.max_span, end - start)
+
+    def remove(self, start: date, shipment_id: str):
+        idx = bisect_left(self.entries, (start, shipment_id))
+        if idx < len(self.entries) and self.entries[idx][1] == shipment_id:
+            _, _, end = self.entries.pop(idx)
+            # Shrink the window once the longest booking goes, e.g. a mistyped year
+            if end - start >= self.max_span:
+                self.max_span = max((e - s for s, _, e in self.entries), default=timedelta(0))
+
+    def overlapping(self, start: date, end: date, exclude_id: Optional[str] = None):
+        lo = bisect_left(self.entries, (start - self.max_span,))
+        hi = bisect_left(self.entries, (end + _ONE_DAY,))
+        for entry_start, shipment_id, entry_end in self.entries[lo:hi]:
+            if entry_end >= start and shipment_id != exclude_id:
+                yield entry_start, shipment_id, entry_end
+
+
+class FleetIndex:
+    """
+    In-memory interval index of lorry and driver bookings, built at startup
+    and kept current from this process's shipment events plus a periodic
+    delta refresh (FleetIndexRefresher) for writes made by other workers.
+    Serves availability; write paths use the authoritative DB check in
+    crud.find_fleet_conflicts. Date windows are inclusive.
+    """
+
+    def __init__(self):
+        self._lorries: Dict[str, _Timeline] = {}
+        self._drivers: Dict[str, _Timeline] = {}
+        # shipment_id -> (lorry key, driver key, start, end)
+        self._bookings: Dict[str, Tuple[Optional[str], Optional[str], date, date]] = {}
+        # Latest shipments.updated_at already applied
+        self.watermark = None
+
+    def __len__(self):
+        return len(self._bookings)
+
+    def clear(self):
+        self._lorries.clear()
+        self._drivers.clear()
+        self._bookings.clear()
+
+    def rebuild(self, rows: Iterable[Tuple[str, Optional[str], Optional[str], date, date]]):
+        """rows: (shipment_id, lorry_no, driver_name, pickup_date, delivery_date)"""
+        self.clear()
+        for shipment_id, lorry_no, driver_name, pickup_date, delivery_date in rows:
+            self.upsert(shipment_id, lorry_no, driver_name, pickup_date, delivery_date)
+
+    def upsert(self, shipment_id: str, lorry_no, driver_name, pickup_date, delivery_date):
+        self.remove(shipment_id)
+        lorry_key = crud.fleet_key(lorry_no)
+        driver_key = crud.fleet_key(driver_name)
+        if not lorry_key and not driver_key:
+            return
+        start, end = sorted((_as_date(pickup_date), _as_date(delivery_date)))
+        if lorry_key:
+            self._lorries.setdefault(lorry_key, _Timeline(lorry_no.strip())).add(start, end, shipment_id)
+        if driver_key:
+            self._drivers.setdefault(driver_key, _Timeline(driver_name.strip())).add(start, end, shipment_id)
+        self._bookings[shipment_id] = (lorry_key, driver_key, start, end)
+
+    def remove(self, shipment_id: Optional[str]):
+        booking = self._bookings.pop(shipment_id, None)
+        if booking is None:
+            return
+        lorry_key, driver_key, start, _ = booking
+        for timelines, key in ((self._lorries, lorry_key), (self._drivers, driver_key)):
+            if key and key in timelines:
+                timelines[key].remove(start, shipment_id)
+                if not timelines[key].entries:
+                    del timelines[key]
+
+    def handle_event(self, message: dict):
+        """Realtime listener: apply created/updated/deleted shipment events."""
+        if message.get("channel") != "shipments":
+            return
+        event = message.get("event")
+        payload = message.get("payload") or {}
+        if event == "deleted":
+            self.remove(payload.get("id"))
+        elif event in ("created", "updated"):
+            self.apply_shipment(payload)
+
+    def apply_shipment(self, fields: dict):
+        shipment_id = fields.get("id")
+        if not shipment_id:
+            return
+        if fields.get("status") == ShipmentStatusEnum.Cancelled or fields.get("deleted_at"):
+            self.remove(shipment_id)
+            return
+        self.upsert(
+            shipment_id,
+            fields.get("lorry_no"),
+            fields.get("driver_name"),
+            fields.get("pickup_date"),
+            fields.get("delivery_date"),
+        )
+
+    def availability(self, start: date, end: date) -> Dict[str, List[dict]]:
+        """Every known lorry and driver with their bookings inside [start, end]."""
+        result = {}
+        for name, timelines in (("lorries", self._lorries), ("drivers", self._drivers)):
+            items = []
+            for timeline in timelines.values():
+                bookings = [
+                    {"shipment_id": shipment_id, "pickup_date": entry_start, "delivery_date": entry_end}
+                    for entry_start, shipment_id, entry_end in timeline.overlapping(start, end)
+                ]
+                items.append({"name": timeline.label, "available": not bookings, "bookings": bookings})
+            items.sort(key=lambda item: item["name"].casefold())
+            result[name] = items
+        return result
+
+
+class FleetIndexRefresher(PeriodicTask):
+    """Pulls shipments changed since the index watermark, so every worker sees every write."""
+
+    # The index was just built at startup
+    run_at_start = False
+    description = "Fleet index refresh"
+
+    def __init__(self, index: FleetIndex, interval_seconds: float):
+        super().__init__(interval_seconds)
+        self.index = index
+
+    def _load_changes(self, since):
+        db = SessionLocal()
+        try:
+            return crud.get_fleet_changes(db, since)
+        finally:
+            db.close()
+
+    async def run_once(self):
+        if self.index.watermark is None:
+            return
+        # >= re-reads rows sharing the last timestamp; re-applying them is harmless
+        changes = await run_in_threadpool(self._load_changes, self.index.watermark)
+        for shipment_id, lorry_no, driver_name, pickup_date, delivery_date, status, deleted_at, updated_at in changes:
+            self.index.apply_shipment({
+                "id": shipment_id,
+                "lorry_no": lorry_no,
+                "driver_name": driver_name,
+                "pickup_date": pickup_date,
+                "delivery_date": delivery_date,
+                "status": status,
+                "deleted_at": deleted_at,
+            })
+            if updated_at is not None and updated_at > self.index.watermark:
+                self.index.watermark = updated_at
+
+
+fleet_index = FleetIndex()
+fleet_refresher = FleetIndexRefresher(fleet_index, config.FLEET_REFRESH_SECONDS)
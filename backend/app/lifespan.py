@@ -0,0 +1,190 @@
+import logging
+import time
+import warnings
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+from fastapi import FastAPI
+from sqlalchemy import Column, inspect, text
+from sqlalchemy.exc import DatabaseError
+from starlette.concurrency import run_in_threadpool
+
+from . import config, crud, models  # noqa: F401 - models registers tables on Base
+from .alerts import shipment_alerts
+from .database import Base, SessionLocal, engine
+from .documents import document_renderer
+from .fleet import fleet_index, fleet_refresher
+from .realtime import shipments_manager
+from .subscriptions import shipment_subscriptions
+
+logger = logging.getLogger(__name__)
+
+
+def ensure_upload_dir() -> Path:
+    upload_dir = Path(config.UPLOAD_DIR).resolve()
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    return upload_dir
+
+
+def ensure_schema() -> None:
+    Base.metadata.create_all(bind=engine)
+
+
+def ensure_indexes() -> List[str]:
+    """
+    Create any model-declared index missing from an existing table.
+    create_all only builds indexes together with new tables.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    created: List[str] = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        with warnings.catch_warnings():
+            # SQLite skips expression indexes (handled below); don't warn on every boot
+            warnings.filterwarnings("ignore", "Skipped unsupported reflection of expression-based index")
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            try:
+                index.create(bind=engine)
+            except DatabaseError:
+                # Expression indexes (lower(lorry_no)) are not reflected on every
+                # dialect, so an existing one can look missing
+                if all(isinstance(expr, Column) for expr in index.expressions):
+                    raise
+                continue
+            logger.warning("Created missing index %s on %s", index.name, table.name)
+            created.append(index.name)
+    return created
+
+
+def backfill_finance_rollup() -> int:
+    """Populate the finance rollup from shipments the first time it is empty."""
+    db = SessionLocal()
+    try:
+        if not crud.finance_rollup_is_empty(db):
+            return 0
+        return crud.rebuild_finance_rollup(db)
+    finally:
+        db.close()
+
+
+def clean_fleet_names() -> int:
+    db = SessionLocal()
+    try:
+        return crud.clean_fleet_names(db)
+    finally:
+        db.close()
+
+
+def build_fleet_index() -> int:
+    db = SessionLocal()
+    try:
+        # Watermark first so writes landing during the load are re-read by the refresher
+        watermark = crud.get_latest_shipment_update(db)
+        fleet_index.rebuild(crud.get_fleet_bookings(db))
+        fleet_index.watermark = watermark or datetime.min
+    finally:
+        db.close()
+    return len(fleet_index)
+
+
+def warm_pool(min_size: int) -> int:
+    """Open up to min_size pooled connections so first requests skip the connect."""
+    size = max(0, min(min_size, config.DB_POOL_SIZE))
+    connections = []
+    try:
+        for _ in range(size):
+            conn = engine.connect()
+            conn.execute(text("SELECT 1"))
+            connections.append(conn)
+    finally:
+        for conn in connections:
+            conn.close()
+    return len(connections)
+
+
+def precompile_statements() -> None:
+    """
+    Run the hot crud lookups once so their SQL lands in the engine's
+    compiled cache; bound values differ per request but the shape does not.
+    """
+    db = SessionLocal()
+    try:
+        crud.get_shipments(db, limit=1)
+        crud.get_shipments(db, limit=1, status=models.ShipmentStatusEnum.New)
+        crud.get_shipment_by_id(db, shipment_id="")
+        crud.get_user_by_id(db, user_id=0)
+        crud.get_user_by_username(db, username="")
+    finally:
+        db.close()
+
+
+def _timed(timings: Dict[str, float], name: str, func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    timings[name] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+def run_schema_setup() -> Dict[str, float]:
+    """
+    create_all, missing indexes, fleet name cleanup and the finance backfill.
+    Must run in exactly one process: `python -m app.main` runs it before
+    forking workers.
+    """
+    crud.check_finance_rollup_dialect(engine.dialect.name)
+    timings: Dict[str, float] = {}
+    _timed(timings, "upload_dir", ensure_upload_dir)
+    _timed(timings, "schema", ensure_schema)
+    _timed(timings, "indexes", ensure_indexes)
+    _timed(timings, "fleet_names", clean_fleet_names)
+    _timed(timings, "finance_rollup", backfill_finance_rollup)
+    return timings
+
+
+def run_startup(skip_schema_check: bool = False) -> Dict[str, float]:
+    """Run the per-process boot steps and return how long each took, in ms."""
+    crud.check_finance_rollup_dialect(engine.dialect.name)
+    if skip_schema_check:
+        timings: Dict[str, float] = {}
+        _timed(timings, "upload_dir", ensure_upload_dir)
+    else:
+        timings = run_schema_setup()
+    _timed(timings, "pool_warmup", warm_pool, config.DB_POOL_MIN_SIZE)
+    _timed(timings, "precompile", precompile_statements)
+    _timed(timings, "fleet_index", build_fleet_index)
+    return timings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    skip_schema_check = config.SKIP_SCHEMA_CHECK
+    timings = await run_in_threadpool(run_startup, skip_schema_check)
+    shipments_manager.add_listener(fleet_index.handle_event)
+    shipments_manager.add_listener(shipment_subscriptions.handle_event)
+    fleet_refresher.start()
+    if config.ALERT_SCHEDULER_ENABLED:
+        shipment_alerts.start()
+    total_ms = round((time.perf_counter() - started) * 1000, 2)
+    app.state.boot_report = {
+        "total_ms": total_ms,
+        "steps_ms": timings,
+        "schema_check": not skip_schema_check,
+    }
+    logger.info("Startup finished in %.2f ms %s", total_ms, timings)
+    try:
+        yield
+    finally:
+        await shipment_alerts.stop()
+        await fleet_refresher.stop()
+        document_renderer.shutdown()
+        shipments_manager.remove_listener(fleet_index.handle_event)
+        shipments_manager.remove_listener(shipment_subscriptions.handle_event)
+        engine.dispose()
@@ -1,20 +1,25 @@
 import asyncio
+import contextlib
 import json
+import logging
+import os
 
-from fastapi import FastAPI, Request, HTTPException, status
+from fastapi import FastAPI, Request, HTTPException, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
-from .database import engine, Base
-from .routers import shipments, auth, uploads
+from .routers import shipments, auth, uploads, reports, fleet, alerts, documents
 from .realtime import shipments_manager
+from .subscriptions import FILTER_FIELDS, parse_filters, shipment_subscriptions
+from .lifespan import lifespan, run_schema_setup
+from .admission import AdmissionControlMiddleware
 from . import security, config
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
 
-app = FastAPI(title="TNT Freight Management System")
+# Schema creation, pool warm-up and upload dir setup run once in the lifespan hook
+app = FastAPI(title="TNT Freight Management System", lifespan=lifespan)
 
 # CORS (Allow React Frontend to talk to this)
 origins = [
@@ -23,6 +28,9 @@ origins = [
     "http://192.168.0.53",   # Deployed host
 ]
 
+# Added before CORS so CORS stays outermost and 429/503 responses carry its headers
+app.add_middleware(AdmissionControlMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -35,17 +43,30 @@ app.add_middleware(
 app.include_router(auth.router, prefix=config.API_PREFIX)
 app.include_router(shipments.router, prefix=config.API_PREFIX)
 app.include_router(uploads.router, prefix=config.API_PREFIX)
+app.include_router(reports.router, prefix=config.API_PREFIX)
+app.include_router(fleet.router, prefix=config.API_PREFIX)
+app.include_router(alerts.router, prefix=config.API_PREFIX)
+app.include_router(documents.router, prefix=config.API_PREFIX)
 
-# Static uploads
+# Static uploads (directory is created by the lifespan hook)
 upload_dir = Path(config.UPLOAD_DIR).resolve()
-upload_dir.mkdir(parents=True, exist_ok=True)
-app.mount(f"{config.API_PREFIX}/uploads", StaticFiles(directory=str(upload_dir)), name="uploads")
+app.mount(
+    f"{config.API_PREFIX}/uploads",
+    StaticFiles(directory=str(upload_dir), check_dir=False),
+    name="uploads",
+)
 
 @app.get("/")
 def read_root():
     return {"message": "Freight System API is running"}
 
 
+@app.get("/health")
+def read_health():
+    # Boot timings stay in the startup log / app.state, not on this public route
+    return {"status": "ok"}
+
+
 @app.get(f"{config.API_PREFIX}/stream/shipments")
 async def shipments_stream(request: Request):
     token = request.query_params.get("token")
@@ -74,3 +95,104 @@ async def shipments_stream(request: Request):
             shipments_manager.disconnect(queue)
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+
+
+@app.websocket(f"{config.API_PREFIX}/ws/shipments")
+async def shipments_websocket(websocket: WebSocket):
+    """
+    Filtered shipment events. Initial filters come from query params
+    (e.g. ?status=Assigned&lorry_no=ABC123); send
+    {"action": "subscribe", "filters": {...}} at any time to replace them.
+    """
+    token = websocket.query_params.get("token")
+    try:
+        if not token:
+            raise ValueError("Missing token")
+        security.decode_access_token(token)
+        filters = parse_filters({
+            field: websocket.query_params.getlist(field)
+            for field in FILTER_FIELDS
+            if field in websocket.query_params
+        })
+    except Exception as exc:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(exc)[:120])
+        return
+
+    await websocket.accept()
+    subscriber = shipment_subscriptions.connect(filters)
+    subscriber.send({"type": "subscribed", "filters": {k: sorted(v) for k, v in filters.items()}})
+
+    async def pump():
+        # Single writer: acks and events both go through the subscriber queue
+        while True:
+            message = await subscriber.queue.get()
+            if subscriber.overflowed:
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                return
+            await websocket.send_json(message)
+
+    sender = asyncio.create_task(pump())
+    try:
+        while True:
+            try:
+                message = await websocket.receive_json()
+            except ValueError:
+                subscriber.send({"type": "error", "detail": "Invalid JSON"})
+                continue
+            action = message.get("action") if isinstance(message, dict) else None
+            if action == "subscribe":
+                try:
+                    filters = parse_filters(message.get("filters"))
+                except ValueError as exc:
+                    subscriber.send({"type": "error", "detail": str(exc)})
+                    continue
+                shipment_subscriptions.update(subscriber, filters)
+                subscriber.send({"type": "subscribed", "filters": {k: sorted(v) for k, v in filters.items()}})
+            elif action == "ping":
+                subscriber.send({"type": "pong"})
+            else:
+                subscriber.send({"type": "error", "detail": "Unknown action"})
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        shipment_subscriptions.disconnect(subscriber)
+        sender.cancel()
+        # Retrieve the pump's outcome, e.g. send_json failing on a dead socket
+        with contextlib.suppress(asyncio.CancelledError, Exception):
+            await sender
+
+if __name__ == "__main__":
+    import argparse
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the freight API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--skip-schema-check",
+        action="store_true",
+        help="Skip schema setup entirely (it already ran in a separate migration step)",
+    )
+    parser.add_argument(
+        "--schema-only",
+        action="store_true",
+        help="Run schema setup and exit; the setup step for `uvicorn --workers N` with SKIP_SCHEMA_CHECK=1",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if not args.skip_schema_check:
+        # Run schema setup once here rather than in each of the N workers
+        logger.info("Schema setup finished %s", run_schema_setup())
+    if args.schema_only:
+        raise SystemExit(0)
+
+    # Env vars reach worker processes, which re-import config
+    os.environ["SKIP_SCHEMA_CHECK"] = "1"
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+    config.SKIP_SCHEMA_CHECK = True
+
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers)
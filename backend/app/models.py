@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Date, Enum, Text, DECIMAL
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Date, Enum, Text, DECIMAL, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -83,4 +83,31 @@ class Shipment(Base):
     updated_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
 
     # Relationships
-    updater = relationship("User")
\ No newline at end of file
+    updater = relationship("User")
+
+    __table_args__ = (
+        # Range scans for the overdue / ETA-soon alert scheduler
+        Index("ix_shipments_status_delivery_date", "status", "delivery_date"),
+        # Double-booking checks (crud.fleet_key lowercases) and the fleet index delta refresh
+        Index("ix_shipments_lorry_key_delivery_date", func.lower(lorry_no), delivery_date),
+        Index("ix_shipments_driver_key_delivery_date", func.lower(driver_name), delivery_date),
+        Index("ix_shipments_updated_at", "updated_at"),
+    )
+
+class ShipmentFinanceDaily(Base):
+    """
+    Per-day finance rollup, maintained incrementally by crud on every shipment
+    write. Keyed on delivery_date; cancelled and deleted shipments are excluded.
+    """
+    __tablename__ = "shipment_finance_daily"
+
+    day = Column(Date, primary_key=True)
+    customer_name = Column(String(100), primary_key=True)
+    shipment_type = Column(Enum(ShipmentTypeEnum), primary_key=True)
+    # Empty string stands in for "no lorry company" so it can be part of the key
+    lorry_company = Column(String(100), primary_key=True, default="")
+
+    revenue_total = Column(DECIMAL(14, 2), default=0.00, nullable=False)
+    cost_total = Column(DECIMAL(14, 2), default=0.00, nullable=False)
+    driver_commission_total = Column(DECIMAL(14, 2), default=0.00, nullable=False)
+    shipment_count = Column(Integer, default=0, nullable=False)
@@ -0,0 +1,46 @@
+import asyncio
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """
+    Runs `run_once` on the event loop every `interval_seconds` until stopped.
+    A failed run is logged and retried on the next tick.
+    """
+
+    # Whether the first run happens at start or one interval later
+    run_at_start = True
+    description = "Periodic task"
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self):
+        raise NotImplementedError
+
+    async def _loop(self):
+        if not self.run_at_start:
+            await asyncio.sleep(self.interval_seconds)
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("%s failed", self.description)
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
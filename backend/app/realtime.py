@@ -1,14 +1,27 @@
-from typing import List
+from typing import Callable, List
 import asyncio
+import logging
 
 from fastapi.encoders import jsonable_encoder
 
+logger = logging.getLogger(__name__)
+
 
 class SSEManager:
     """Lightweight manager to fan out shipment events over SSE."""
 
     def __init__(self):
         self.connections: List[asyncio.Queue] = []
+        # In-process consumers (e.g. the fleet index) that see every event first
+        self.listeners: List[Callable[[dict], None]] = []
+
+    def add_listener(self, listener: Callable[[dict], None]):
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[dict], None]):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
 
     async def connect(self) -> asyncio.Queue:
         queue: asyncio.Queue = asyncio.Queue()
@@ -20,6 +33,11 @@ class SSEManager:
             self.connections.remove(queue)
 
     async def broadcast(self, message):
+        for listener in list(self.listeners):
+            try:
+                listener(message)
+            except Exception:
+                logger.exception("Realtime listener failed")
         stale: List[asyncio.Queue] = []
         for queue in self.connections:
             try:
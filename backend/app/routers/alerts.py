@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends
+from .. import schemas
+from ..alerts import shipment_alerts
+from ..dependencies import get_current_user
+
+router = APIRouter(
+    prefix="/alerts",
+    tags=["Alerts"]
+)
+
+
+@router.get("/shipments", response_model=schemas.ShipmentAlertsResponse)
+async def read_shipment_alerts(current_user = Depends(get_current_user)):
+    """Latest overdue / ETA-soon set from the scheduler; no DB query per call."""
+    snapshot = shipment_alerts.snapshot()
+    return schemas.ShipmentAlertsResponse(
+        checked_at=shipment_alerts.checked_at,
+        overdue=snapshot["overdue"],
+        eta_soon=snapshot["eta_soon"],
+    )
@@ -0,0 +1,72 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from .. import schemas, crud, database, config
+from ..dependencies import get_current_user
+from ..documents import document_renderer, shipment_fields, unrenderable_fields
+from ..models import RoleEnum
+
+router = APIRouter(
+    prefix="/shipments",
+    tags=["Documents"]
+)
+
+
+def _load_document_fields(db: Session, shipment_ids):
+    return [shipment_fields(shipment) for shipment in crud.get_shipments_by_ids(db, shipment_ids)]
+
+
+@router.post("/documents")
+async def generate_documents(
+    payload: schemas.DocumentBatchRequest,
+    db: Session = Depends(database.get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Render delivery orders and/or invoices for a batch of shipments and
+    stream them back as a ZIP. Rendering runs in a process pool; PDFs of
+    unchanged shipments come from the on-disk cache.
+    """
+    kinds = list(dict.fromkeys(kind.value for kind in payload.kinds))
+    if schemas.DocumentKind.invoice.value in kinds and current_user.role != RoleEnum.admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can generate invoices")
+
+    shipment_ids = list(dict.fromkeys(payload.shipment_ids))
+    if len(shipment_ids) > config.DOCUMENT_BATCH_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {config.DOCUMENT_BATCH_MAX} shipments per batch",
+        )
+
+    shipments = await run_in_threadpool(_load_document_fields, db, shipment_ids)
+    missing = set(shipment_ids) - {fields["id"] for fields in shipments}
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"message": "Shipments not found", "shipment_ids": sorted(missing)},
+        )
+
+    # Refuse rather than print "???" in place of names the PDF fonts lack
+    unrenderable = []
+    for fields in shipments:
+        bad = unrenderable_fields(fields)
+        if bad:
+            unrenderable.append({"shipment_id": fields["id"], "fields": bad})
+    if unrenderable:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "message": "Some shipments contain characters the document fonts cannot print",
+                "shipments": unrenderable,
+            },
+        )
+
+    jobs = [(kind, fields) for fields in shipments for kind in kinds]
+    filename = f"shipment-documents-{datetime.utcnow():%Y%m%d-%H%M%S}.zip"
+    return StreamingResponse(
+        document_renderer.stream_zip(jobs),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
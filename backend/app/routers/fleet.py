@@ -0,0 +1,26 @@
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from .. import schemas
+from ..dependencies import get_current_user
+from ..fleet import fleet_index
+
+router = APIRouter(
+    prefix="/fleet",
+    tags=["Fleet"]
+)
+
+
+@router.get("/availability", response_model=schemas.FleetAvailabilityResponse)
+async def read_fleet_availability(
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    current_user = Depends(get_current_user)
+):
+    """
+    Lorries and drivers with their bookings in the inclusive [from, to] window.
+    Served from the in-memory fleet index, so no DB query is made.
+    """
+    if date_from > date_to:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'from' must not be after 'to'")
+    availability = fleet_index.availability(date_from, date_to)
+    return schemas.FleetAvailabilityResponse(date_from=date_from, date_to=date_to, **availability)
@@ -0,0 +1,82 @@
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from .. import schemas, crud, database
+from ..dependencies import get_current_user
+from ..models import RoleEnum
+
+router = APIRouter(
+    prefix="/reports",
+    tags=["Reports"]
+)
+
+FINANCE_DIMENSIONS = ("day", "month", "customer", "shipment_type", "lorry_company")
+
+
+def _finance_row(values: dict) -> schemas.FinanceReportRow:
+    revenue = values.get("revenue") or Decimal("0.00")
+    cost = values.get("cost") or Decimal("0.00")
+    commission = values.get("driver_commission") or Decimal("0.00")
+    month = None
+    if values.get("year") is not None:
+        month = f"{int(values['year']):04d}-{int(values['month']):02d}"
+    return schemas.FinanceReportRow(
+        day=values.get("day"),
+        month=month,
+        customer_name=values.get("customer"),
+        shipment_type=values.get("shipment_type"),
+        lorry_company=values.get("lorry_company") or None,
+        revenue=revenue,
+        cost=cost,
+        driver_commission=commission,
+        margin=revenue - cost - commission,
+        shipment_count=int(values.get("shipment_count") or 0),
+    )
+
+
+@router.get("/finance", response_model=schemas.FinanceReportResponse)
+def read_finance_report(
+    group_by: str = "month",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(database.get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Revenue, cost, driver commission and margin from the daily finance rollup.
+    group_by is a comma-separated list of day, month, customer, shipment_type, lorry_company.
+    """
+    if current_user.role != RoleEnum.admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can view finance reports")
+
+    dimensions = [item.strip() for item in group_by.split(",") if item.strip()]
+    unknown = [item for item in dimensions if item not in FINANCE_DIMENSIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown group_by value(s): {', '.join(unknown)}",
+        )
+    if "day" in dimensions and "month" in dimensions:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Group by day or month, not both")
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="date_from must not be after date_to")
+
+    labels, results = crud.get_finance_report(db, dimensions, date_from=date_from, date_to=date_to)
+    rows = [_finance_row(dict(zip(labels + ["revenue", "cost", "driver_commission", "shipment_count"], result)))
+            for result in results]
+
+    totals = _finance_row({
+        "revenue": sum((row.revenue for row in rows), Decimal("0.00")),
+        "cost": sum((row.cost for row in rows), Decimal("0.00")),
+        "driver_commission": sum((row.driver_commission for row in rows), Decimal("0.00")),
+        "shipment_count": sum(row.shipment_count for row in rows),
+    })
+    return schemas.FinanceReportResponse(
+        group_by=dimensions,
+        date_from=date_from,
+        date_to=date_to,
+        rows=rows,
+        totals=totals,
+    )
@@ -1,23 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from typing import List
-from .. import schemas, crud, database, realtime
+from typing import List, Optional
+from .. import schemas, crud, database, realtime, config, encoding
 from ..dependencies import get_current_user
 from ..models import RoleEnum
+from ..subscriptions import filter_snapshot
 
 router = APIRouter(
     prefix="/shipments",
     tags=["Shipments"]
 )
 
+
+def _fleet_conflict_exception(exc: crud.FleetConflictError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={
+            "code": "fleet_conflict",
+            "message": str(exc),
+            "conflicts": exc.conflicts
+        }
+    )
+
+
 @router.post("/", response_model=schemas.ShipmentResponse)
 async def create_new_shipment(
     shipment: schemas.ShipmentCreate,
+    force: bool = False,
     db: Session = Depends(database.get_db),
     current_user = Depends(get_current_user)
 ):
     try:
-        created = crud.create_shipment(db=db, shipment=shipment, user_id=current_user.id)
+        created = crud.create_shipment(db=db, shipment=shipment, user_id=current_user.id, force=force)
+    except crud.FleetConflictError as exc:
+        raise _fleet_conflict_exception(exc)
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
     
@@ -29,13 +45,36 @@ async def create_new_shipment(
 
 @router.get("/", response_model=List[schemas.ShipmentResponse])
 def read_shipments(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     status: str = None,
+    accept: Optional[str] = Header(default=None),
     db: Session = Depends(database.get_db),
     current_user = Depends(get_current_user)
 ):
     shipments = crud.get_shipments(db, skip=skip, limit=limit, status=status)
+    # Accept: application/vnd.freight.columnar+json or application/x-msgpack for the compact form
+    media_type = encoding.negotiate(accept)
+    if media_type:
+        return encoding.compact_shipments_response(shipments, media_type)
+    response.headers["Vary"] = "Accept"
+    return shipments
+
+@router.get("/export", response_model=List[schemas.ShipmentResponse])
+def export_shipments(
+    response: Response,
+    status: str = None,
+    accept: Optional[str] = Header(default=None),
+    db: Session = Depends(database.get_db),
+    current_user = Depends(get_current_user)
+):
+    """All shipments (up to EXPORT_MAX_ROWS), with the same content negotiation as the list."""
+    shipments = crud.get_shipments(db, skip=0, limit=config.EXPORT_MAX_ROWS, status=status)
+    media_type = encoding.negotiate(accept)
+    if media_type:
+        return encoding.compact_shipments_response(shipments, media_type)
+    response.headers["Vary"] = "Accept"
     return shipments
 
 @router.get("/{shipment_id}", response_model=schemas.ShipmentResponse)
@@ -53,20 +92,35 @@ def read_shipment_detail(
 async def update_shipment(
     shipment_id: str, 
     shipment_update: schemas.ShipmentUpdate,
+    force: bool = False,
     db: Session = Depends(database.get_db),
     current_user = Depends(get_current_user)
 ):
-    updated_shipment = crud.update_shipment_status(
-        db, 
-        shipment_id=shipment_id, 
-        update_data=shipment_update,
-        user_id=current_user.id
-    )
+    existing = crud.get_shipment_by_id(db, shipment_id=shipment_id)
+    if existing is None:
+        raise HTTPException(status_code=404, detail="Shipment not found")
+    # Copied before the update mutates the instance, so WS filters can see what it left
+    previous = filter_snapshot(existing)
+    try:
+        updated_shipment = crud.update_shipment_status(
+            db, 
+            shipment_id=shipment_id, 
+            update_data=shipment_update,
+            user_id=current_user.id,
+            force=force
+        )
+    except crud.FleetConflictError as exc:
+        raise _fleet_conflict_exception(exc)
     if updated_shipment is None:
         raise HTTPException(status_code=404, detail="Shipment not found")
         
     await realtime.shipments_manager.broadcast(
-        {"channel": "shipments", "event": "updated", "payload": realtime.serialize_shipment(updated_shipment)}
+        {
+            "channel": "shipments",
+            "event": "updated",
+            "payload": realtime.serialize_shipment(updated_shipment),
+            "previous": previous
+        }
     )
     return updated_shipment
 
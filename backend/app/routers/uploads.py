@@ -13,8 +13,8 @@ router = APIRouter(
 
 ALLOWED_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".pdf", ".webp"}
 
+# Created once at startup by the lifespan hook
 UPLOAD_ROOT = Path(config.UPLOAD_DIR).resolve()
-UPLOAD_ROOT.mkdir(parents=True, exist_ok=True)
 
 
 def _validate_extension(filename: str) -> str:
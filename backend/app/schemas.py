@@ -1,6 +1,6 @@
 from datetime import date, datetime
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 from decimal import Decimal
 from pydantic import BaseModel, Field
 
@@ -17,6 +17,10 @@ class ShipmentType(str, Enum):
     In_House = "In-House"
     Outsource = "Outsource"
 
+class DocumentKind(str, Enum):
+    delivery_order = "delivery_order"
+    invoice = "invoice"
+
 class UserRole(str, Enum):
     admin = "admin"
     staff = "staff"
@@ -87,6 +91,57 @@ class ShipmentResponse(ShipmentBase):
     class Config:
         from_attributes = True
 
+class DocumentBatchRequest(BaseModel):
+    shipment_ids: List[str] = Field(..., min_length=1)
+    # Invoices are admin-only, so they must be asked for explicitly
+    kinds: List[DocumentKind] = [DocumentKind.delivery_order]
+
+class ShipmentAlertsResponse(BaseModel):
+    checked_at: Optional[datetime] = None
+    overdue: List[ShipmentResponse]
+    eta_soon: List[ShipmentResponse]
+
+# --- Fleet Schemas ---
+
+class FleetBooking(BaseModel):
+    shipment_id: str
+    pickup_date: date
+    delivery_date: date
+
+class FleetResourceAvailability(BaseModel):
+    name: str
+    available: bool
+    bookings: List[FleetBooking]
+
+class FleetAvailabilityResponse(BaseModel):
+    date_from: date
+    date_to: date
+    lorries: List[FleetResourceAvailability]
+    drivers: List[FleetResourceAvailability]
+
+# --- Report Schemas ---
+
+class FinanceReportRow(BaseModel):
+    # Grouping dimensions; only the requested ones are filled in
+    day: Optional[date] = None
+    month: Optional[str] = None  # YYYY-MM
+    customer_name: Optional[str] = None
+    shipment_type: Optional[ShipmentType] = None
+    lorry_company: Optional[str] = None
+
+    revenue: Decimal
+    cost: Decimal
+    driver_commission: Decimal
+    margin: Decimal
+    shipment_count: int
+
+class FinanceReportResponse(BaseModel):
+    group_by: List[str]
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    rows: List[FinanceReportRow]
+    totals: FinanceReportRow
+
 # --- User Schemas (Unchanged) ---
 class UserBase(BaseModel):
     username: str
@@ -0,0 +1,169 @@
+import asyncio
+import itertools
+from typing import Dict, FrozenSet, List, Set
+
+from . import config, schemas
+
+FILTER_FIELDS = ("status", "shipment_type", "customer_name", "lorry_no", "driver_name")
+_CASE_INSENSITIVE = {"customer_name", "lorry_no", "driver_name"}
+_ALLOWED_VALUES = {
+    "status": {item.value for item in schemas.ShipmentStatus},
+    "shipment_type": {item.value for item in schemas.ShipmentType},
+}
+
+Filters = Dict[str, FrozenSet[str]]
+
+
+def _normalize(field: str, value) -> str:
+    value = getattr(value, "value", value)
+    if field in _CASE_INSENSITIVE:
+        return " ".join(str(value).split()).casefold()
+    return str(value)
+
+
+def parse_filters(raw) -> Filters:
+    """
+    Validate {field: value | [values]} into normalized filters. Values within
+    a field are OR-ed, fields are AND-ed; no filters means every event.
+    """
+    if raw is None:
+        return {}
+    if not isinstance(raw, dict):
+        raise ValueError("filters must be an object")
+    filters: Filters = {}
+    for field, values in raw.items():
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"Unknown filter field: {field}")
+        if values is None:
+            continue
+        if not isinstance(values, (list, tuple)):
+            values = [values]
+        normalized = frozenset(_normalize(field, value) for value in values if value not in (None, ""))
+        allowed = _ALLOWED_VALUES.get(field)
+        if allowed and not normalized <= allowed:
+            raise ValueError(f"Invalid {field} value(s): {', '.join(sorted(normalized - allowed))}")
+        if normalized:
+            filters[field] = normalized
+    return filters
+
+
+def filter_snapshot(shipment) -> Dict[str, object]:
+    """Current filterable values of a shipment, for the `previous` of an update event."""
+    return {field: getattr(getattr(shipment, field), "value", getattr(shipment, field)) for field in FILTER_FIELDS}
+
+
+class Subscriber:
+    __slots__ = ("id", "queue", "filters", "overflowed")
+
+    def __init__(self, subscriber_id: int, max_queue: int):
+        self.id = subscriber_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.filters: Filters = {}
+        self.overflowed = False
+
+    def send(self, message) -> bool:
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            # Slow client: the pump closes the socket so the client resyncs
+            self.overflowed = True
+            return False
+
+
+class SubscriptionHub:
+    """
+    Routes shipment events to WebSocket subscribers through an inverted index
+    (field -> value -> subscriber ids). An event only touches subscribers
+    listed under its own field values: a subscriber matches when its hit
+    count equals the number of fields it filters on.
+    """
+
+    def __init__(self, max_queue: int = 1000):
+        self.max_queue = max_queue
+        self._subscribers: Dict[int, Subscriber] = {}
+        self._postings: Dict[str, Dict[str, Set[int]]] = {field: {} for field in FILTER_FIELDS}
+        self._match_all: Set[int] = set()
+        self._ids = itertools.count(1)
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def connect(self, filters: Filters) -> Subscriber:
+        subscriber = Subscriber(next(self._ids), self.max_queue)
+        self._subscribers[subscriber.id] = subscriber
+        self._index(subscriber, filters)
+        return subscriber
+
+    def update(self, subscriber: Subscriber, filters: Filters):
+        self._unindex(subscriber)
+        self._index(subscriber, filters)
+
+    def disconnect(self, subscriber: Subscriber):
+        if self._subscribers.pop(subscriber.id, None) is not None:
+            self._unindex(subscriber)
+
+    def _index(self, subscriber: Subscriber, filters: Filters):
+        subscriber.filters = filters
+        if not filters:
+            self._match_all.add(subscriber.id)
+            return
+        for field, values in filters.items():
+            postings = self._postings[field]
+            for value in values:
+                postings.setdefault(value, set()).add(subscriber.id)
+
+    def _unindex(self, subscriber: Subscriber):
+        self._match_all.discard(subscriber.id)
+        for field, values in subscriber.filters.items():
+            postings = self._postings[field]
+            for value in values:
+                ids = postings.get(value)
+                if ids is not None:
+                    ids.discard(subscriber.id)
+                    if not ids:
+                        del postings[value]
+        subscriber.filters = {}
+
+    def match(self, payload: dict) -> List[Subscriber]:
+        if not any(payload.get(field) is not None for field in FILTER_FIELDS):
+            # e.g. deletions only carry the id; let every client drop it
+            return list(self._subscribers.values())
+        hits: Dict[int, int] = {}
+        for field in FILTER_FIELDS:
+            value = payload.get(field)
+            if value is None:
+                continue
+            for subscriber_id in self._postings[field].get(_normalize(field, value), ()):
+                hits[subscriber_id] = hits.get(subscriber_id, 0) + 1
+        matched = [
+            self._subscribers[subscriber_id]
+            for subscriber_id, count in hits.items()
+            if count == len(self._subscribers[subscriber_id].filters)
+        ]
+        matched.extend(self._subscribers[subscriber_id] for subscriber_id in self._match_all)
+        return matched
+
+    def handle_event(self, message: dict):
+        """
+        Realtime listener: queue the event for each matching subscriber. An
+        update carrying `previous` filter values also sends a `removed` event
+        to subscribers that matched the shipment before but no longer do.
+        """
+        if not self._subscribers:
+            return
+        payload = message.get("payload") or {}
+        matched = self.match(payload)
+        for subscriber in matched:
+            subscriber.send(message)
+        previous = message.get("previous")
+        if not previous or not any(value is not None for value in previous.values()):
+            return
+        matched_ids = {subscriber.id for subscriber in matched}
+        removed = {"channel": message.get("channel"), "event": "removed", "payload": {"id": payload.get("id")}}
+        for subscriber in self.match({**payload, **previous}):
+            if subscriber.id not in matched_ids:
+                subscriber.send(removed)
+
+
+shipment_subscriptions = SubscriptionHub(max_queue=config.WS_QUEUE_MAX)
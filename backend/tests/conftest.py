@@ -0,0 +1,72 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Point the app at a throwaway SQLite DB before anything under app/ is imported
+_TMP_DIR = Path(tempfile.mkdtemp(prefix="freight-tests-"))
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP_DIR / 'test.db'}"
+os.environ["UPLOAD_DIR"] = str(_TMP_DIR / "uploads")
+os.environ["DOCUMENT_CACHE_DIR"] = str(_TMP_DIR / "document_cache")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["ALERT_SCHEDULER_ENABLED"] = "false"
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import models  # noqa: E402,F401
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+def shipment_payload(**overrides):
+    payload = {
+        "customer_name": "ACME",
+        "collection_from": "Port Klang",
+        "deliver_to": "Shah Alam",
+        "pickup_date": "2026-10-01",
+        "delivery_date": "2026-10-03",
+        "shipment_type": "In-House",
+        "revenue_amount": "100.00",
+        "cost_amount": "40.00",
+        "driver_commission": "10.00",
+        "lorry_no": "WXY 1234",
+        "lorry_company": "Fast Lorries",
+        "driver_name": "Ali",
+    }
+    payload.update(overrides)
+    return payload
+
+
+@pytest.fixture
+def db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(db):
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def admin_headers(client):
+    client.post("/api/auth/register", json={"username": "admin", "password": "password123", "role": "admin"})
+    response = client.post("/api/auth/login", json={"username": "admin", "password": "password123", "force": True})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def staff_headers(client):
+    client.post("/api/auth/register", json={"username": "staff", "password": "password123", "role": "staff"})
+    response = client.post("/api/auth/login", json={"username": "staff", "password": "password123", "force": True})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
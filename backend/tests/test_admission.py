@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from app import config
+from app.admission import AdmissionControlMiddleware, TokenBuckets
+
+
+def test_bucket_allows_burst_then_reports_wait():
+    buckets = TokenBuckets(rate=2.0, burst=3)
+    assert [buckets.take("ip", 100.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert buckets.take("ip", 100.0) == pytest.approx(0.5)
+    # Other keys have their own bucket
+    assert buckets.take("other", 100.0) == 0.0
+
+
+def test_bucket_refills_with_elapsed_time():
+    buckets = TokenBuckets(rate=2.0, burst=3)
+    for _ in range(3):
+        buckets.take("ip", 100.0)
+    assert buckets.take("ip", 100.25) == pytest.approx(0.25)
+    assert buckets.take("ip", 100.5) == 0.0
+    # Refill is capped at the burst size
+    assert [buckets.take("ip", 1000.0) for _ in range(4)][-1] == pytest.approx(0.5)
+
+
+def test_sweep_drops_only_full_buckets():
+    buckets = TokenBuckets(rate=1.0, burst=2, sweep_interval=10)
+    buckets._last_sweep = 0.0
+    buckets.take("idle", 0.0)
+    buckets.take("busy", 0.0)
+    buckets.take("busy", 9.5)
+    buckets.take("busy", 9.5)
+    buckets.take("trigger", 10.5)
+
+    assert set(buckets._buckets) == {"busy", "trigger"}
+
+
+@pytest.fixture
+def middleware(monkeypatch):
+    monkeypatch.setattr(config, "RATE_LIMIT_ENABLED", True)
+    release = asyncio.Event()
+
+    async def app(scope, receive, send):
+        if scope["path"].endswith("/slow"):
+            await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    instance = AdmissionControlMiddleware(app)
+    instance.release = release
+    return instance
+
+
+async def _call(app, method, path, query_string=b"", client=("10.0.0.1", 1234)):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "query_string": query_string,
+             "headers": [], "client": client}
+    await app(scope, receive, send)
+    start = messages[0]
+    return start["status"], dict(start["headers"])
+
+
+@pytest.mark.parametrize("method, path, query_string, expected", [
+    ("POST", "/api/auth/login", b"", "login"),
+    ("POST", "/api/auth/login/", b"", "login"),
+    ("GET", "/api/auth/login", b"", None),
+    ("POST", "/api/uploads", b"", "upload"),
+    ("GET", "/api/shipments/export", b"", "export"),
+    ("POST", "/api/shipments/documents", b"", "export"),
+    ("GET", "/api/shipments", b"limit=500", "large_list"),
+    ("GET", "/api/shipments/", b"skip=0&limit=50", None),
+    ("GET", "/api/shipments", b"limit=lots", None),
+    ("GET", "/api/shipments", b"", None),
+])
+def test_classify(middleware, method, path, query_string, expected):
+    assert middleware._classify(method, path, query_string) == expected
+
+
+def test_login_is_limited_with_retry_after(middleware):
+    async def scenario():
+        return [await _call(middleware, "POST", "/api/auth/login") for _ in range(6)]
+
+    results = asyncio.run(scenario())
+    assert [status for status, _ in results] == [200] * 5 + [429]
+    # 10 logins per minute: the next token is 6 seconds away
+    assert results[-1][1][b"retry-after"] == b"6"
+
+
+def test_full_concurrency_slot_returns_503(middleware):
+    middleware.concurrency_limits["export"] = 1
+
+    async def scenario():
+        first = asyncio.ensure_future(_call(middleware, "GET", "/api/shipments/export/slow"))
+        await asyncio.sleep(0)
+        rejected = await _call(middleware, "GET", "/api/shipments/export", client=("10.0.0.2", 1))
+        middleware.release.set()
+        return await first, rejected, middleware.active["export"]
+
+    first, rejected, active = asyncio.run(scenario())
+    assert first[0] == 200
+    assert rejected[0] == 503
+    assert rejected[1][b"retry-after"] == str(config.ADMISSION_RETRY_AFTER_SECONDS).encode()
+    assert active == 0
+
+
+def test_disabled_lets_everything_through(middleware, monkeypatch):
+    monkeypatch.setattr(config, "RATE_LIMIT_ENABLED", False)
+
+    async def scenario():
+        return [await _call(middleware, "POST", "/api/auth/login") for _ in range(10)]
+
+    assert {status for status, _ in asyncio.run(scenario())} == {200}
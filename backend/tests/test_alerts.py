@@ -0,0 +1,96 @@
+import asyncio
+from datetime import date
+
+from app import crud, schemas
+from app.alerts import CLEARED, ETA_SOON, OVERDUE, ShipmentAlertScheduler
+from app.periodic import PeriodicTask
+from app.realtime import SSEManager
+from app.subscriptions import SubscriptionHub, parse_filters
+
+from conftest import shipment_payload
+
+TODAY = date(2026, 10, 10)
+
+
+def _create(db, **overrides):
+    return crud.create_shipment(db, schemas.ShipmentCreate(**shipment_payload(**overrides)), user_id=None, force=True)
+
+
+def _scheduler():
+    manager = SSEManager()
+    events = []
+    manager.add_listener(events.append)
+    return ShipmentAlertScheduler(manager, interval_seconds=60, eta_soon_days=2), events
+
+
+def _run(scheduler, events, today):
+    events.clear()
+    asyncio.run(scheduler.run_once(today=today))
+    return sorted((message["event"], message["payload"]["id"]) for message in events)
+
+
+def test_run_once_broadcasts_only_changes(db):
+    scheduler, events = _scheduler()
+    overdue = _create(db, pickup_date="2026-10-01", delivery_date="2026-10-09")
+    soon = _create(db, pickup_date="2026-10-01", delivery_date="2026-10-11", lorry_no="ABC 1")
+    _create(db, pickup_date="2026-10-01", delivery_date="2026-10-20", lorry_no="ABC 2")
+
+    assert _run(scheduler, events, TODAY) == sorted([(OVERDUE, overdue.id), (ETA_SOON, soon.id)])
+    assert {kind: [item["id"] for item in items] for kind, items in scheduler.snapshot().items()} == {
+        OVERDUE: [overdue.id], ETA_SOON: [soon.id],
+    }
+
+    # Nothing changed: nothing is sent
+    assert _run(scheduler, events, TODAY) == []
+
+    # A day later the eta_soon shipment is overdue
+    assert _run(scheduler, events, date(2026, 10, 12)) == [(OVERDUE, soon.id)]
+
+    crud.update_shipment_status(db, overdue.id, schemas.ShipmentUpdate(status="Delivered"), user_id=None)
+    assert _run(scheduler, events, date(2026, 10, 12)) == [(CLEARED, overdue.id)]
+    cleared = events[0]["payload"]
+    assert cleared["previous"] == OVERDUE
+    assert cleared["lorry_no"] == "WXY 1234"
+
+
+def test_cleared_only_reaches_matching_subscribers(db):
+    scheduler, events = _scheduler()
+    hub = SubscriptionHub()
+    scheduler.manager.add_listener(hub.handle_event)
+    watching = hub.connect(parse_filters({"lorry_no": "WXY 1234"}))
+    other = hub.connect(parse_filters({"lorry_no": "ABC 1"}))
+    shipment = _create(db, pickup_date="2026-10-01", delivery_date="2026-10-09")
+
+    _run(scheduler, events, TODAY)
+    crud.delete_shipment(db, shipment.id)
+    _run(scheduler, events, TODAY)
+
+    received = []
+    while not watching.queue.empty():
+        received.append(watching.queue.get_nowait()["event"])
+    assert received == [OVERDUE, CLEARED]
+    assert other.queue.empty()
+
+
+def test_periodic_task_survives_failures_and_stops():
+    class Flaky(PeriodicTask):
+        def __init__(self):
+            super().__init__(interval_seconds=0)
+            self.calls = 0
+
+        async def run_once(self):
+            self.calls += 1
+            if self.calls == 1:
+                raise RuntimeError("boom")
+
+    async def scenario():
+        task = Flaky()
+        task.start()
+        while task.calls < 3:
+            await asyncio.sleep(0)
+        await task.stop()
+        return task
+
+    task = asyncio.run(scenario())
+    assert task.calls >= 3
+    assert task._task is None
@@ -0,0 +1,101 @@
+import asyncio
+import io
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app import config
+from app.documents import DELIVERY_ORDER, DOCUMENT_FIELDS, DocumentRenderer, document_version
+
+from conftest import shipment_payload
+
+
+def _fields(**overrides):
+    fields = {name: "" for name in DOCUMENT_FIELDS}
+    fields.update(id="0123456789abcdef", booking_reference="BK-1", customer_name="ACME")
+    fields.update(overrides)
+    return fields
+
+
+@pytest.fixture
+def renderer(tmp_path):
+    renderer = DocumentRenderer(str(tmp_path), max_workers=1)
+    yield renderer
+    renderer.shutdown()
+
+
+def _render(renderer, fields):
+    return asyncio.run(renderer._render_one(DELIVERY_ORDER, fields))[1]
+
+
+def test_changed_shipment_overwrites_its_cache_file(renderer, tmp_path):
+    first = _render(renderer, _fields())
+    assert _render(renderer, _fields()) == first
+
+    second = _render(renderer, _fields(customer_name="Globex"))
+    assert second != first
+    files = list(tmp_path.rglob("*.pdf"))
+    assert [path.name for path in files] == ["0123456789abcdef-delivery_order.pdf"]
+    header, _, content = files[0].read_bytes().partition(b"\n")
+    assert header.decode() == document_version(DELIVERY_ORDER, _fields(customer_name="Globex"))
+    assert content == second
+
+
+def test_concurrent_stores_leave_a_complete_file(renderer, tmp_path):
+    path = tmp_path / "01" / "shipment-delivery_order.pdf"
+    payloads = [bytes([n]) * 200_000 for n in range(8)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda content: renderer._store(path, "v1", content), payloads))
+
+    assert renderer._load(path, "v1") in payloads
+    assert not list(path.parent.glob("*.tmp"))
+
+
+def test_cache_write_failure_is_not_fatal(renderer, monkeypatch):
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(tempfile, "NamedTemporaryFile", fail)
+    assert _render(renderer, _fields()).startswith(b"%PDF-1.4")
+
+
+def test_staff_default_batch_is_delivery_orders_only(client, admin_headers, staff_headers):
+    created = client.post("/api/shipments/", json=shipment_payload(), headers=admin_headers).json()
+
+    response = client.post("/api/shipments/documents", json={"shipment_ids": [created["id"]]}, headers=staff_headers)
+    assert response.status_code == 200
+    names = zipfile.ZipFile(io.BytesIO(response.content)).namelist()
+    assert len(names) == 1 and names[0].startswith("delivery_order/")
+
+    invoices = client.post(
+        "/api/shipments/documents",
+        json={"shipment_ids": [created["id"]], "kinds": ["invoice"]},
+        headers=staff_headers,
+    )
+    assert invoices.status_code == 403
+
+
+def test_cp1252_text_renders_without_replacement(renderer):
+    content = _render(renderer, _fields(customer_name="Café Müller – “Express”"))
+    assert "Café Müller – “Express”".encode("cp1252") in content
+    assert b"?" not in content.split(b"stream", 1)[1].split(b"endstream", 1)[0]
+
+
+def test_non_latin_names_are_rejected_not_garbled(client, admin_headers):
+    created = client.post("/api/shipments/", json=shipment_payload(driver_name="陈伟明"), headers=admin_headers).json()
+
+    response = client.post("/api/shipments/documents", json={"shipment_ids": [created["id"]]}, headers=admin_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"]["shipments"] == [{"shipment_id": created["id"], "fields": ["driver_name"]}]
+
+
+def test_pool_size_is_shared_between_api_workers(monkeypatch, tmp_path):
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(config, "API_WORKERS", 4)
+    assert DocumentRenderer(str(tmp_path)).max_workers == 2
+    monkeypatch.setattr(config, "API_WORKERS", 16)
+    assert DocumentRenderer(str(tmp_path)).max_workers == 1
+    assert DocumentRenderer(str(tmp_path), max_workers=3).max_workers == 3
@@ -0,0 +1,87 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+import msgpack
+import pytest
+
+from app.encoding import COLUMNAR_JSON, MSGPACK, negotiate
+
+from conftest import shipment_payload
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, None),
+    ("", None),
+    ("application/json", None),
+    ("*/*", None),
+    (COLUMNAR_JSON, COLUMNAR_JSON),
+    (MSGPACK, MSGPACK),
+    (f"application/json, {COLUMNAR_JSON}", None),
+    (f"application/json;q=0.5, {COLUMNAR_JSON}", COLUMNAR_JSON),
+    (f"{MSGPACK};q=0.9, {COLUMNAR_JSON};q=0.8", MSGPACK),
+    (f"{MSGPACK};q=0, application/json", None),
+    (f"text/html, {MSGPACK};q=0.1", MSGPACK),
+    (f"*/*;q=0.9, {COLUMNAR_JSON};q=bogus", None),
+    ("text/html", None),
+])
+def test_negotiate(accept, expected):
+    assert negotiate(accept) == expected
+
+
+def _decode(payload):
+    """Client-side decoding of the columnar format back into the default JSON shape."""
+    rows = []
+    for row in payload["rows"]:
+        item = {}
+        for name, value in zip(payload["columns"], row):
+            encoding = payload["encodings"][name]
+            if value is not None and encoding == "dict":
+                value = payload["dictionaries"][name][value]
+            elif value is not None and encoding == "days":
+                value = (date(1970, 1, 1) + timedelta(days=value)).isoformat()
+            elif value is not None and encoding == "cents":
+                value = str(Decimal(value) / 100)
+            item[name] = value
+        rows.append(item)
+    return rows
+
+
+@pytest.fixture
+def shipments(client, admin_headers):
+    client.post("/api/shipments/", json=shipment_payload(), headers=admin_headers)
+    client.post(
+        "/api/shipments/?force=true",
+        json=shipment_payload(shipment_type="Outsource", revenue_amount="1234.56", cost_amount="0.05",
+                              pickup_date="1969-12-30", delivery_date="2026-10-05", lorry_no=None),
+        headers=admin_headers,
+    )
+    response = client.get("/api/shipments/", headers=admin_headers)
+    assert "Accept" in response.headers["vary"]
+    assert response.headers["content-type"] == "application/json"
+    return response.json()
+
+
+@pytest.mark.parametrize("media_type", [COLUMNAR_JSON, MSGPACK])
+def test_compact_formats_round_trip_to_default_json(client, admin_headers, shipments, media_type):
+    response = client.get("/api/shipments/", headers={**admin_headers, "Accept": media_type})
+    assert response.headers["content-type"] == media_type
+    assert "Accept" in response.headers["vary"]
+    payload = response.json() if media_type == COLUMNAR_JSON else msgpack.unpackb(response.content)
+
+    assert payload["encodings"]["status"] == "dict"
+    assert payload["encodings"]["pickup_date"] == "days"
+    assert payload["encodings"]["revenue_amount"] == "cents"
+    assert payload["encodings"]["created_at"] == "iso"
+    decoded = _decode(payload)
+    # Money compares as Decimal: the default JSON keeps the DB's scale
+    for row in decoded + shipments:
+        for name in ("revenue_amount", "cost_amount", "driver_commission"):
+            row[name] = Decimal(row[name])
+    assert decoded == shipments
+
+
+def test_export_negotiates_like_the_list(client, admin_headers, shipments):
+    default = client.get("/api/shipments/export", headers=admin_headers)
+    assert default.json() == shipments
+    compact = client.get("/api/shipments/export", headers={**admin_headers, "Accept": COLUMNAR_JSON})
+    assert len(compact.json()["rows"]) == len(shipments)
@@ -0,0 +1,119 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app import crud, models, schemas
+
+from conftest import shipment_payload
+
+
+def _create(db, **overrides):
+    return crud.create_shipment(db, schemas.ShipmentCreate(**shipment_payload(**overrides)), user_id=None, force=True)
+
+
+def _rollup(db):
+    db.expire_all()
+    return {
+        (row.day, row.customer_name, models.ShipmentTypeEnum(row.shipment_type).value, row.lorry_company): (
+            Decimal(row.revenue_total),
+            Decimal(row.cost_total),
+            Decimal(row.driver_commission_total),
+            row.shipment_count,
+        )
+        for row in db.query(models.ShipmentFinanceDaily).all()
+    }
+
+
+ACME_KEY = (date(2026, 10, 3), "ACME", "In-House", "Fast Lorries")
+
+
+def test_create_adds_to_existing_key(db):
+    _create(db)
+    _create(db, revenue_amount="50.50", cost_amount=None)
+
+    assert _rollup(db) == {ACME_KEY: (Decimal("150.50"), Decimal("40.00"), Decimal("20.00"), 2)}
+
+
+def test_missing_lorry_company_uses_empty_key(db):
+    _create(db, lorry_company=None)
+
+    assert list(_rollup(db)) == [(date(2026, 10, 3), "ACME", "In-House", "")]
+
+
+def test_edit_amounts_adjusts_totals(db):
+    shipment = _create(db)
+    crud.update_shipment_status(db, shipment.id, schemas.ShipmentUpdate(revenue_amount="120.00"), user_id=None)
+
+    assert _rollup(db) == {ACME_KEY: (Decimal("120.00"), Decimal("40.00"), Decimal("10.00"), 1)}
+
+
+def test_edit_key_moves_amounts_between_rows(db):
+    _create(db)
+    moved = _create(db)
+    crud.update_shipment_status(
+        db, moved.id, schemas.ShipmentUpdate(customer_name="Globex", delivery_date="2026-11-05"), user_id=None,
+        force=True,
+    )
+
+    assert _rollup(db) == {
+        ACME_KEY: (Decimal("100.00"), Decimal("40.00"), Decimal("10.00"), 1),
+        (date(2026, 11, 5), "Globex", "In-House", "Fast Lorries"): (
+            Decimal("100.00"), Decimal("40.00"), Decimal("10.00"), 1,
+        ),
+    }
+
+
+def test_cancel_removes_and_reinstate_restores(db):
+    shipment = _create(db)
+    crud.update_shipment_status(db, shipment.id, schemas.ShipmentUpdate(status="Cancelled"), user_id=None)
+    assert _rollup(db) == {}
+
+    crud.update_shipment_status(db, shipment.id, schemas.ShipmentUpdate(status="Assigned"), user_id=None)
+    assert _rollup(db) == {ACME_KEY: (Decimal("100.00"), Decimal("40.00"), Decimal("10.00"), 1)}
+
+
+def test_delete_removes_contribution(db):
+    kept = _create(db)
+    deleted = _create(db, revenue_amount="30.00")
+    assert crud.delete_shipment(db, deleted.id)
+
+    assert _rollup(db) == {ACME_KEY: (Decimal("100.00"), Decimal("40.00"), Decimal("10.00"), 1)}
+    assert crud.delete_shipment(db, kept.id)
+    assert _rollup(db) == {}
+
+
+def test_rebuild_matches_incremental_maintenance(db):
+    first = _create(db)
+    second = _create(db, customer_name="Globex", shipment_type="Outsource", lorry_company=None)
+    third = _create(db, delivery_date="2026-10-20", revenue_amount="75.25")
+    _create(db, status="Cancelled")
+    crud.update_shipment_status(db, first.id, schemas.ShipmentUpdate(cost_amount="55.00"), user_id=None)
+    crud.update_shipment_status(db, second.id, schemas.ShipmentUpdate(lorry_company="Slow Lorries"), user_id=None)
+    crud.delete_shipment(db, third.id)
+
+    incremental = _rollup(db)
+    assert crud.rebuild_finance_rollup(db) == len(incremental)
+    assert _rollup(db) == incremental
+
+
+def test_rebuild_is_idempotent_and_drops_stale_rows(db):
+    _create(db)
+    _create(db, customer_name="Globex")
+    expected = _rollup(db)
+    db.add(models.ShipmentFinanceDaily(
+        day=date(2020, 1, 1), customer_name="Gone", shipment_type=models.ShipmentTypeEnum.In_House,
+        lorry_company="", revenue_total=1, cost_total=0, driver_commission_total=0, shipment_count=1,
+    ))
+    db.commit()
+
+    # Two workers backfilling at once each write the same totals
+    crud.rebuild_finance_rollup(db)
+    crud.rebuild_finance_rollup(db)
+    assert _rollup(db) == expected
+
+
+def test_unsupported_dialect_fails_at_startup():
+    crud.check_finance_rollup_dialect("sqlite")
+    with pytest.raises(RuntimeError, match="mssql"):
+        crud.check_finance_rollup_dialect("mssql")
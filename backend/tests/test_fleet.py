@@ -0,0 +1,188 @@
+import asyncio
+from datetime import date, timedelta
+
+from app import crud, schemas
+from app.fleet import FleetIndex, _Timeline, fleet_index, fleet_refresher
+
+from conftest import shipment_payload
+
+
+def _ids(timeline, start, end, exclude_id=None):
+    return sorted(shipment_id for _, shipment_id, _ in timeline.overlapping(start, end, exclude_id))
+
+
+def test_timeline_inclusive_ends():
+    timeline = _Timeline("WXY 1234")
+    timeline.add(date(2026, 10, 1), date(2026, 10, 3), "a")
+
+    assert _ids(timeline, date(2026, 10, 3), date(2026, 10, 5)) == ["a"]
+    assert _ids(timeline, date(2026, 9, 28), date(2026, 10, 1)) == ["a"]
+    assert _ids(timeline, date(2026, 10, 4), date(2026, 10, 9)) == []
+    assert _ids(timeline, date(2026, 9, 1), date(2026, 9, 30)) == []
+
+
+def test_timeline_same_start_date_and_remove():
+    timeline = _Timeline("WXY 1234")
+    timeline.add(date(2026, 10, 1), date(2026, 10, 1), "b")
+    timeline.add(date(2026, 10, 1), date(2026, 10, 4), "a")
+    timeline.add(date(2026, 10, 1), date(2026, 10, 2), "c")
+
+    assert _ids(timeline, date(2026, 10, 1), date(2026, 10, 1)) == ["a", "b", "c"]
+    assert _ids(timeline, date(2026, 10, 1), date(2026, 10, 1), exclude_id="b") == ["a", "c"]
+
+    timeline.remove(date(2026, 10, 1), "b")
+    assert _ids(timeline, date(2026, 10, 1), date(2026, 10, 1)) == ["a", "c"]
+    # Removing an unknown id or with the wrong start is a no-op
+    timeline.remove(date(2026, 10, 1), "zzz")
+    timeline.remove(date(2026, 10, 2), "a")
+    assert len(timeline.entries) == 2
+
+
+def test_timeline_max_span_window_finds_long_bookings():
+    timeline = _Timeline("WXY 1234")
+    timeline.add(date(2026, 1, 1), date(2026, 3, 31), "long")
+    for day in range(10):
+        start = date(2026, 2, 1) + timedelta(days=day)
+        timeline.add(start, start, f"short-{day}")
+
+    assert timeline.max_span == timedelta(days=89)
+    # Starts long before the query window but still overlaps it
+    assert _ids(timeline, date(2026, 3, 20), date(2026, 3, 21)) == ["long"]
+    assert _ids(timeline, date(2026, 4, 1), date(2026, 4, 2)) == []
+
+
+def test_timeline_max_span_shrinks_when_longest_booking_is_removed():
+    timeline = _Timeline("WXY 1234")
+    timeline.add(date(2026, 1, 1), date(2026, 1, 3), "short")
+    timeline.add(date(2026, 1, 1), date(2028, 1, 1), "typo")
+    timeline.add(date(2026, 2, 1), date(2026, 2, 6), "week")
+
+    timeline.remove(date(2026, 1, 1), "typo")
+    assert timeline.max_span == timedelta(days=5)
+
+    timeline.remove(date(2026, 1, 1), "short")
+    assert timeline.max_span == timedelta(days=5)
+    timeline.remove(date(2026, 2, 1), "week")
+    assert timeline.max_span == timedelta(0)
+
+
+def test_index_normalizes_names_and_moves_bookings():
+    index = FleetIndex()
+    index.upsert("a", " wxy  1234 ", "Ali", "2026-10-01", "2026-10-03")
+    index.upsert("b", "WXY 1234", None, "2026-10-02", "2026-10-02")
+    availability = index.availability(date(2026, 10, 2), date(2026, 10, 2))
+    assert [len(item["bookings"]) for item in availability["lorries"]] == [2]
+    index.remove("b")
+
+    index.apply_shipment({"id": "a", "lorry_no": "ABC 1", "driver_name": "Ali",
+                          "pickup_date": "2026-10-01", "delivery_date": "2026-10-03"})
+    availability = index.availability(date(2026, 10, 2), date(2026, 10, 2))
+    assert [item["name"] for item in availability["lorries"]] == ["ABC 1"]
+
+    index.apply_shipment({"id": "a", "status": "Cancelled"})
+    assert len(index) == 0
+    assert index.availability(date(2026, 10, 2), date(2026, 10, 2)) == {"lorries": [], "drivers": []}
+
+
+def test_create_conflict_returns_409_unless_forced(client, admin_headers):
+    first = client.post("/api/shipments/", json=shipment_payload(), headers=admin_headers)
+    assert first.status_code == 200
+
+    clash = shipment_payload(pickup_date="2026-10-03", delivery_date="2026-10-04", driver_name="Bala")
+    response = client.post("/api/shipments/", json=clash, headers=admin_headers)
+    assert response.status_code == 409
+    detail = response.json()["detail"]
+    assert detail["code"] == "fleet_conflict"
+    assert [(c["resource"], c["shipment_id"]) for c in detail["conflicts"]] == [("lorry_no", first.json()["id"])]
+
+    forced = client.post("/api/shipments/?force=true", json=clash, headers=admin_headers)
+    assert forced.status_code == 200
+
+
+def test_cancelled_shipments_do_not_conflict(client, admin_headers):
+    first = client.post("/api/shipments/", json=shipment_payload(), headers=admin_headers).json()
+    client.patch(f"/api/shipments/{first['id']}", json={"status": "Cancelled"}, headers=admin_headers)
+
+    assert client.post("/api/shipments/", json=shipment_payload(), headers=admin_headers).status_code == 200
+
+
+def test_update_conflict_returns_409_unless_forced(client, admin_headers):
+    client.post("/api/shipments/", json=shipment_payload(), headers=admin_headers)
+    other = client.post(
+        "/api/shipments/",
+        json=shipment_payload(lorry_no="ABC 1", driver_name="Bala", pickup_date="2026-10-05", delivery_date="2026-10-06"),
+        headers=admin_headers,
+    ).json()
+
+    # Editing its own dates never conflicts with itself
+    own = client.patch(f"/api/shipments/{other['id']}", json={"delivery_date": "2026-10-07"}, headers=admin_headers)
+    assert own.status_code == 200
+
+    clash = client.patch(f"/api/shipments/{other['id']}", json={"lorry_no": "WXY 1234", "pickup_date": "2026-10-02"},
+                         headers=admin_headers)
+    assert clash.status_code == 409
+    unchanged = client.get(f"/api/shipments/{other['id']}", headers=admin_headers).json()
+    assert unchanged["lorry_no"] == "ABC 1"
+
+    forced = client.patch(f"/api/shipments/{other['id']}?force=true",
+                          json={"lorry_no": "WXY 1234", "pickup_date": "2026-10-02"}, headers=admin_headers)
+    assert forced.status_code == 200
+
+
+def test_db_check_catches_writes_the_local_index_never_saw(client, admin_headers, db):
+    # Simulates another worker: written straight through crud, no broadcast here
+    other_worker = crud.create_shipment(db, schemas.ShipmentCreate(**shipment_payload()), user_id=None)
+    assert other_worker.id not in fleet_index._bookings
+
+    response = client.post("/api/shipments/", json=shipment_payload(driver_name="Bala"), headers=admin_headers)
+    assert response.status_code == 409
+
+    asyncio.run(fleet_refresher.run_once())
+    availability = client.get("/api/fleet/availability", params={"from": "2026-10-02", "to": "2026-10-02"},
+                              headers=admin_headers).json()
+    assert availability["lorries"] == [{
+        "name": "WXY 1234",
+        "available": False,
+        "bookings": [{"shipment_id": other_worker.id, "pickup_date": "2026-10-01", "delivery_date": "2026-10-03"}],
+    }]
+
+
+def test_status_edit_on_forced_overlap_is_not_rechecked(client, admin_headers):
+    client.post("/api/shipments/", json=shipment_payload(), headers=admin_headers)
+    forced = client.post("/api/shipments/?force=true", json=shipment_payload(), headers=admin_headers).json()
+
+    # The dashboard form resends every field, booking fields included
+    full_edit = {**shipment_payload(), "status": "Delivered"}
+    response = client.patch(f"/api/shipments/{forced['id']}", json=full_edit, headers=admin_headers)
+    assert response.status_code == 200
+    assert response.json()["status"] == "Delivered"
+
+    cancelled = client.patch(f"/api/shipments/{forced['id']}", json={"status": "Cancelled"}, headers=admin_headers)
+    assert cancelled.status_code == 200
+    # Reactivating a cancelled booking is checked again
+    reactivated = client.patch(f"/api/shipments/{forced['id']}", json={"status": "New"}, headers=admin_headers)
+    assert reactivated.status_code == 409
+
+
+def test_conflicts_ignore_case_and_spacing(client, admin_headers, db):
+    client.post("/api/shipments/", json=shipment_payload(), headers=admin_headers)
+
+    response = client.post("/api/shipments/", json=shipment_payload(lorry_no=" wxy  1234", driver_name="Bala"),
+                           headers=admin_headers)
+    assert response.status_code == 409
+    assert response.json()["detail"]["conflicts"][0]["value"] == "WXY 1234"
+
+    forced = client.post("/api/shipments/?force=true", json=shipment_payload(lorry_no=" wxy  1234 "),
+                         headers=admin_headers)
+    assert forced.json()["lorry_no"] == "wxy 1234"
+
+
+def test_clean_fleet_names_fixes_legacy_rows(db):
+    shipment = crud.create_shipment(db, schemas.ShipmentCreate(**shipment_payload()), user_id=None)
+    shipment.lorry_no = " WXY  1234 "
+    shipment.driver_name = "Ali"
+    db.commit()
+
+    assert crud.clean_fleet_names(db) == 1
+    db.refresh(shipment)
+    assert shipment.lorry_no == "WXY 1234"
@@ -0,0 +1,57 @@
+from conftest import shipment_payload
+
+
+def _book(client, headers, **overrides):
+    response = client.post("/api/shipments/?force=true", json=shipment_payload(**overrides), headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_finance_report_is_admin_only(client, staff_headers):
+    response = client.get("/api/reports/finance", headers=staff_headers)
+    assert response.status_code == 403
+
+
+def test_finance_report_validates_group_by_and_dates(client, admin_headers):
+    unknown = client.get("/api/reports/finance", params={"group_by": "month,driver"}, headers=admin_headers)
+    assert unknown.status_code == 400
+    assert "driver" in unknown.json()["detail"]
+
+    both = client.get("/api/reports/finance", params={"group_by": "day,month"}, headers=admin_headers)
+    assert both.status_code == 400
+
+    backwards = client.get("/api/reports/finance", params={"date_from": "2026-10-05", "date_to": "2026-10-01"},
+                           headers=admin_headers)
+    assert backwards.status_code == 400
+
+
+def test_finance_report_by_month_and_day_with_totals(client, admin_headers):
+    _book(client, admin_headers)
+    _book(client, admin_headers, delivery_date="2026-10-20", revenue_amount="50.00", cost_amount="20.00",
+          driver_commission="5.00")
+    _book(client, admin_headers, pickup_date="2026-11-01", delivery_date="2026-11-02", customer_name="Globex")
+    cancelled = _book(client, admin_headers, revenue_amount="999.00")
+    client.patch(f"/api/shipments/{cancelled['id']}", json={"status": "Cancelled"}, headers=admin_headers)
+
+    monthly = client.get("/api/reports/finance", headers=admin_headers).json()
+    assert monthly["group_by"] == ["month"]
+    assert [(row["month"], row["revenue"], row["margin"], row["shipment_count"]) for row in monthly["rows"]] == [
+        ("2026-10", "150.00", "75.00", 2),
+        ("2026-11", "100.00", "50.00", 1),
+    ]
+    totals = monthly["totals"]
+    assert (totals["revenue"], totals["cost"], totals["driver_commission"], totals["margin"]) == (
+        "250.00", "100.00", "25.00", "125.00",
+    )
+    assert totals["shipment_count"] == 3
+
+    daily = client.get(
+        "/api/reports/finance",
+        params={"group_by": "day,customer", "date_from": "2026-10-01", "date_to": "2026-10-31"},
+        headers=admin_headers,
+    ).json()
+    assert [(row["day"], row["customer_name"], row["revenue"]) for row in daily["rows"]] == [
+        ("2026-10-03", "ACME", "100.00"),
+        ("2026-10-20", "ACME", "50.00"),
+    ]
+    assert daily["totals"]["shipment_count"] == 2
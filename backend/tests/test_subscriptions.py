@@ -0,0 +1,65 @@
+from app.subscriptions import SubscriptionHub, parse_filters
+
+from conftest import shipment_payload
+
+
+def _drain(subscriber):
+    messages = []
+    while not subscriber.queue.empty():
+        messages.append(subscriber.queue.get_nowait())
+    return messages
+
+
+def _updated(payload, previous=None):
+    message = {"channel": "shipments", "event": "updated", "payload": payload}
+    if previous is not None:
+        message["previous"] = previous
+    return message
+
+
+def test_match_requires_every_filtered_field():
+    hub = SubscriptionHub()
+    lorry = hub.connect(parse_filters({"status": ["New", "Assigned"], "lorry_no": "wxy  1234"}))
+    everything = hub.connect({})
+
+    hub.handle_event(_updated({"id": "a", "status": "Assigned", "lorry_no": "WXY 1234"}))
+    hub.handle_event(_updated({"id": "b", "status": "Assigned", "lorry_no": "ABC 1"}))
+
+    assert [m["payload"]["id"] for m in _drain(lorry)] == ["a"]
+    assert [m["payload"]["id"] for m in _drain(everything)] == ["a", "b"]
+
+
+def test_update_that_leaves_a_filter_sends_removed():
+    hub = SubscriptionHub()
+    new_only = hub.connect(parse_filters({"status": "New"}))
+    assigned_only = hub.connect(parse_filters({"status": "Assigned"}))
+    everything = hub.connect({})
+    previous = {"status": "New", "shipment_type": "In-House", "customer_name": "ACME",
+                "lorry_no": "WXY 1234", "driver_name": "Ali"}
+
+    hub.handle_event(_updated({"id": "a", "status": "Assigned", "lorry_no": "WXY 1234"}, previous))
+
+    assert _drain(new_only) == [{"channel": "shipments", "event": "removed", "payload": {"id": "a"}}]
+    assert [m["event"] for m in _drain(assigned_only)] == ["updated"]
+    assert [m["event"] for m in _drain(everything)] == ["updated"]
+
+
+def test_update_still_matching_sends_no_removed():
+    hub = SubscriptionHub()
+    lorry = hub.connect(parse_filters({"lorry_no": "WXY 1234"}))
+
+    hub.handle_event(_updated({"id": "a", "status": "Assigned", "lorry_no": "WXY 1234"},
+                              {"status": "New", "lorry_no": "WXY 1234"}))
+
+    assert [m["event"] for m in _drain(lorry)] == ["updated"]
+
+
+def test_websocket_receives_removed_when_shipment_leaves_filter(client, admin_headers):
+    created = client.post("/api/shipments/", json=shipment_payload(), headers=admin_headers).json()
+    token = admin_headers["Authorization"].split()[1]
+
+    with client.websocket_connect(f"/api/ws/shipments?token={token}&status=New") as websocket:
+        assert websocket.receive_json() == {"type": "subscribed", "filters": {"status": ["New"]}}
+        response = client.patch(f"/api/shipments/{created['id']}", json={"status": "Assigned"}, headers=admin_headers)
+        assert response.status_code == 200
+        assert websocket.receive_json() == {"channel": "shipments", "event": "removed", "payload": {"id": created["id"]}}